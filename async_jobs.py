@@ -0,0 +1,145 @@
+"""
+asyncio front end for blind evaluation jobs.
+
+Every modulus gets its own single-process executor, so jobs share the workers
+instead of spawning their own. A job reads its input stream asynchronously
+and fans every chunk out to one bounded queue per modulus - a slow modulus
+only holds back the producer once its own queue is full - then awaits the
+CRT reconstruction of the final state. If one modulus fails (its worker dies
+or raises), the job raises that error and drops the work of the others.
+"""
+import asyncio
+import string
+from concurrent.futures import ProcessPoolExecutor
+
+import randomness
+from main import ALPHABET, QUEUE_MAX_SIZE, encode, transition_table
+from secret_sharing.mathlib import garner_algorithm
+
+_TABLE = None  # the transition table of the executor's modulus
+
+
+def _init_executor(table):
+    global _TABLE
+    _TABLE = table
+
+
+def _advance(state, chunk):
+    table, mod = _TABLE, len(_TABLE)
+    for c in chunk:
+        state = table[(state + c) % mod]
+    return state
+
+
+class BlindEvaluator:
+    def __init__(self, polys, max_pending=QUEUE_MAX_SIZE):
+        self.max_pending = max_pending
+        self.encoding = {c: encode(c) for c in string.ascii_letters + ALPHABET}
+        self.executors = {
+            mod: ProcessPoolExecutor(
+                max_workers=1,
+                initializer=_init_executor,
+                initargs=(transition_table(poly, mod).tolist(), ))
+            for mod, poly in polys.items()
+        }
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for executor in self.executors.values():
+            executor.shutdown(cancel_futures=True)
+
+    async def _consume(self, mod, queue, state):
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = await queue.get()
+            if chunk is None:  # stop
+                return state, mod
+            state = await loop.run_in_executor(self.executors[mod], _advance,
+                                               state, chunk)
+
+    @staticmethod
+    async def _put(queues, consumers, item):
+        """Put item on every queue, raising as soon as a consumer fails - the
+        producer would otherwise wait forever on the dead consumer's queue."""
+        puts = asyncio.gather(*(q.put(item) for q in queues.values()))
+        try:
+            done, _ = await asyncio.wait({puts, *consumers},
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for consumer in done - {puts}:
+                consumer.result()  # raises the consumer's exception
+            await puts
+        finally:
+            puts.cancel()
+
+    async def evaluate(self, stream, initial_state):
+        """Run an async iterable of text chunks through the machine and
+        return its final state."""
+        queues = {
+            mod: asyncio.Queue(maxsize=self.max_pending)
+            for mod in self.executors
+        }
+        consumers = [
+            asyncio.create_task(self._consume(mod, q, initial_state % mod))
+            for mod, q in queues.items()
+        ]
+        try:
+            async for text in stream:
+                chunk = [
+                    self.encoding[c] if c in self.encoding else encode(c)
+                    for c in text
+                ]  # encode raises on unsupported characters
+                await self._put(queues, consumers, chunk)
+            await self._put(queues, consumers, None)
+            results = await asyncio.gather(*consumers)
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+        return garner_algorithm([x for x, _ in results],
+                                [x for _, x in results])
+
+
+async def random_stream(chunks, length, job=None):
+    rng = randomness.generator('documents', worker=job)
+    for _ in range(chunks):
+        yield ''.join(ALPHABET[i] for i in rng.integers(len(ALPHABET),
+                                                        size=length))
+        await asyncio.sleep(0)  # as if reading from a socket
+
+
+async def run(polys, initial_state, jobs, chunks, length):
+    async with BlindEvaluator(polys) as evaluator:
+        return await asyncio.gather(*(evaluator.evaluate(
+            random_stream(chunks, length, job), initial_state)
+                                      for job in range(jobs)))
+
+
+def main():
+    import argparse
+
+    from crt.generic_functions import get_mignotte_params
+    from main import generate_data, interpolate_per_modulus
+    from state_machine import compiler
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=8)
+    parser.add_argument('--chunks', type=int, default=64)
+    parser.add_argument('--length', type=int, default=1024)
+    args = parser.parse_args()
+
+    xy_s = compiler.points(generate_data())
+    _, ms = get_mignotte_params(xy_s, n=5, k=5)
+    polys = {
+        mod: poly.reduce(mod)
+        for mod, poly in interpolate_per_modulus(xy_s, ms).items()
+    }
+    states = asyncio.run(run(polys, 200, args.jobs, args.chunks, args.length))
+    print(f'next states are: {states}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import randomness  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    random.seed(0)  # the same inputs on every run
+    randomness.configure(seed=0)
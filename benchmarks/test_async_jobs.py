@@ -0,0 +1,75 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import async_jobs
+import main
+from crt.generic_functions import get_mignotte_params
+from secret_sharing.mathlib import garner_algorithm
+from state_machine import compiler
+
+MACHINE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                       'state_machine', 'nano.json')
+
+
+async def stream(texts):
+    for text in texts:
+        yield text
+
+
+async def endless(text):
+    while True:
+        yield text
+
+
+def machine_polys():
+    machine, initial = compiler.load(MACHINE, main.ALPHABET)
+    transitions, initial_state = compiler.compile_machine(
+        machine, initial, main.encode)
+    xy_s = compiler.points(transitions)
+    _, ms = get_mignotte_params(xy_s, n=5, k=5)
+    return {
+        mod: poly.reduce(mod)
+        for mod, poly in main.interpolate_per_modulus(xy_s, ms).items()
+    }, initial_state
+
+
+def test_mixed_case_matches_the_synchronous_path():
+    polys, initial_state = machine_polys()
+    texts = ['Hello World.\n', 'MiXeD cAsE tExT', 'the NaN']  # ends in 'nan'
+
+    expected = list()
+    for mod, poly in polys.items():
+        table = main.transition_table(poly, mod)
+        state = initial_state % mod
+        for c in ''.join(texts):
+            state = table[(state + main.encode(c)) % mod]
+        expected += [(int(state), mod)]
+
+    async def evaluate():
+        async with async_jobs.BlindEvaluator(polys) as evaluator:
+            return await evaluator.evaluate(stream(texts), initial_state)
+
+    assert asyncio.run(evaluate()) == garner_algorithm(
+        [x for x, _ in expected], [x for _, x in expected])
+
+
+def test_a_dead_executor_fails_the_job():
+    polys, initial_state = machine_polys()
+
+    async def evaluate():
+        async with async_jobs.BlindEvaluator(polys,
+                                             max_pending=1) as evaluator:
+            mod = next(iter(evaluator.executors))
+            evaluator.executors[mod].shutdown()
+            evaluator.executors[mod] = ProcessPoolExecutor(
+                max_workers=1, initializer=os._exit,
+                initargs=(1, ))  # the worker dies on start
+            return await asyncio.wait_for(
+                evaluator.evaluate(endless('some text'), initial_state), 30)
+
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(evaluate())
@@ -0,0 +1,28 @@
+import os
+
+import main
+from blind_operations import bgv_planner
+from state_machine import compiler
+
+MACHINE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                       'state_machine', 'nano.json')
+
+
+def test_saved_circuit_round_trips(tmp_path):
+    machine, initial = compiler.load(MACHINE, main.ALPHABET)
+    p = bgv_planner.plan(machine, list(main.ALPHABET))
+    path = str(tmp_path / 'circuit.json')
+    bgv_planner.save(p, path, slots=4)
+
+    loaded = bgv_planner.load(path)
+    assert loaded == {k: p[k] for k in loaded}
+    assert all(a < p['width'] + g and b < p['width'] + g
+               for g, (_, a, b) in enumerate(loaded['gates']))  # topological
+    documents = ['hello nano', 'nan nan na', 'nanonanono', 'banana. no']
+    expected = list()
+    for document in documents:
+        state = initial
+        for c in document:
+            state = machine[state][0][c]
+        expected += [state]
+    assert bgv_planner.simulate(loaded, initial, documents) == expected
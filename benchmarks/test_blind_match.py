@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from blind_operations import blind_match, circuit
+
+WIDTH = blind_match.WIDTH
+TABLES = {
+    'one-hot': blind_match.T_PACKED,
+    'wildcard': blind_match.T_PACKED + [(0b111111, 0b000011)],
+    'mixed pairs': [(0b101001, 0b101010), (0b011001, 0b010101),
+                    (0b111010, 0b000100), (0b001001, 0b110000)],
+}
+
+
+@pytest.mark.parametrize('exclusive', [True, False])
+@pytest.mark.parametrize('name', TABLES)
+def test_lookup_and_circuit_match_the_scan(name, exclusive):
+    table = TABLES[name]
+    index, rest = blind_match.build_index(table)
+    gates, outputs = circuit.generate(table, WIDTH, exclusive)
+    for x in range(2**WIDTH):
+        expected = blind_match.match_packed(x, table)
+        assert blind_match.lookup(x, index, rest) == expected, bin(x)
+        # XOR-combining assumes one-hot inputs, OR-combining is exact
+        if blind_match.is_one_hot(x) or not exclusive:
+            assert circuit.evaluate(gates, outputs, x, WIDTH) == expected, \
+                bin(x)
+
+
+def test_wider_table():
+    width = 8
+    table = [(0b10101010, 0b01), (0b10011001, 0b10), (0b11101010, 0b100)]
+    index, rest = blind_match.build_index(table, width)
+    assert blind_match.match_packed(0b01101010, table[:1], width) == 0
+    for x in range(2**width):
+        expected = sum(1 << i for i, (state, _) in enumerate(table)
+                       if all((x & state) >> low & 0b11
+                              for low in range(0, width, 2)))
+        assert blind_match.match_packed(x, table, width) == expected, bin(x)
+        assert blind_match.lookup(x, index, rest, width) == expected, bin(x)
+    with pytest.raises(ValueError):
+        blind_match.match_packed(0b01101010, table)  # the 6-bit default
+
+
+@pytest.mark.parametrize('name', TABLES)
+def test_match_many(name):
+    xs = list(range(2**WIDTH))
+    assert list(blind_match.match_many(xs, TABLES[name])) == [
+        blind_match.match_packed(x, TABLES[name]) for x in xs
+    ]
+
+
+def test_match_many_wide_table():
+    width = 40
+    rng = random.Random(0)
+
+    def state():  # no 00 pairs, so entries can fire
+        return sum(rng.choice([0b01, 0b10, 0b11]) << low
+                   for low in range(0, width, 2))
+
+    table = [(state(), rng.getrandbits(width)) for _ in range(16)]
+    xs = [state() for _ in range(256)] + [s for s, _ in table]
+    assert list(blind_match.match_many(xs, table, width)) == [
+        blind_match.match_packed(x, table, width) for x in xs
+    ]
+
+
+def test_lookup(benchmark):
+    benchmark(lambda: [blind_match.lookup(x) for x in range(2**WIDTH)])
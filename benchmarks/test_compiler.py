@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+import main
+from state_machine import compiler
+
+MACHINE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                       'state_machine', 'nano.json')
+
+
+def write(tmp_path, states, initial='start'):
+    path = str(tmp_path / 'machine.json')
+    with open(path, 'w') as f:
+        json.dump({'initial': initial, 'states': states}, f)
+    return path
+
+
+def test_compiled_machine_follows_the_json():
+    machine, initial = compiler.load(MACHINE, main.ALPHABET)
+    codes = compiler.assign_codes(machine, initial, main.encode)
+    transitions, initial_state = compiler.compile_machine(
+        machine, initial, main.encode, codes)
+    assert len(set(codes.values())) == len(codes)
+    assert initial_state == codes[initial]
+
+    xy_s = compiler.points(transitions)
+    state, code = initial, initial_state
+    for c in 'a nano. nan nanonano':
+        state, code = machine[state][0][c], xy_s[code + main.encode(c)]
+        assert code == codes[state]
+    assert transitions[code][1] == 1  # nano
+
+
+def test_colliding_codes_are_rejected():
+    machine = {
+        'a': ({'x': 'a', 'y': 'b'}, 0),
+        'b': ({'x': 'a', 'y': 'b'}, 1),  # key 1 leads to a and to b
+    }
+    encode = {'x': 0, 'y': 1}.get
+    with pytest.raises(Exception, match='leads to both'):
+        compiler.compile_machine(machine, 'a', encode, {'a': 0, 'b': 1})
+    transitions, _ = compiler.compile_machine(machine, 'a', encode)
+    assert len(compiler.points(transitions)) == 4
+
+
+def test_incomplete_machine_is_rejected(tmp_path):
+    path = write(tmp_path, {
+        'start': {'default': 'start', 'transitions': {'n': 'n'}},
+        'n': {'transitions': {'a': 'start'}},
+    })
+    with pytest.raises(Exception, match=r'state \[n\] has no transition'):
+        compiler.load(path, main.ALPHABET)
+    with pytest.raises(Exception, match=r'state \[n\] has no transition'):
+        compiler.compile_machine({
+            'start': ({'n': 'n', 'a': 'start'}, 0),
+            'n': ({'a': 'start'}, 0),
+        }, 'start', main.encode)
+
+
+def test_undefined_destination_is_rejected(tmp_path):
+    path = write(tmp_path, {
+        'start': {'default': 'start', 'transitions': {'n': 'nowhere'}},
+    })
+    with pytest.raises(Exception, match=r'undefined state \[nowhere\]'):
+        compiler.load(path, main.ALPHABET)
+    with pytest.raises(Exception, match=r'initial state \[end\]'):
+        compiler.load(write(tmp_path, {'start': {'default': 'start'}}, 'end'),
+                      main.ALPHABET)
+
+
+def test_from_machine_needs_every_symbol():
+    transitions = pytest.importorskip('transitions')
+    fsm = transitions.Machine(states=['start', 'n'], initial='start')
+    fsm.add_transition('n', '*', 'n')
+    fsm.add_transition('a', 'n', 'start')
+    with pytest.raises(Exception, match=r'state \[start\] has no transition'):
+        compiler.from_machine(fsm, 'na')
+    fsm.add_transition('a', 'start', None)  # internal, stays in start
+    machine, initial = compiler.from_machine(fsm, 'na')
+    assert machine['start'][0] == {'n': 'n', 'a': 'start'}
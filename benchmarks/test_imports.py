@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['matplotlib', 'transitions', 'graphviz', 'tqdm']
+
+MODULES = [
+    'main',
+    'polynomials.polymod',
+    'polynomials.lagrange',
+    'secret_sharing.mathlib',
+    'crt.generic_functions',
+]
+
+
+def import_in_new_interpreter(module):
+    """Import the module the way a spawned worker does and return the heavy
+    (plotting or graph) modules it pulled in."""
+    out = subprocess.run([
+        sys.executable, '-c', f'import sys, {module}; '
+        f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    ],
+                         cwd=ROOT,
+                         check=True,
+                         capture_output=True,
+                         text=True).stdout.strip()
+    return out.split(',') if out else []
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_import_time(benchmark, module):
+    heavy = benchmark.pedantic(import_in_new_interpreter,
+                               args=(module, ),
+                               rounds=5)
+    benchmark.extra_info['heavy_modules'] = heavy
+    assert not heavy, f'{module} imports {heavy} at load time'
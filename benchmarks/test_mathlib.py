@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+import pytest
+
+import randomness
+from crt.generic_functions import get_ab_shares
+from polynomials import shamir
+from secret_sharing import mathlib
+
+SHAMIR_PRIME = 2**31 - 1
+
+
+@pytest.mark.parametrize('bits', [64, 512])
+@pytest.mark.parametrize('k', [3, 5, 8])
+def test_garner_algorithm(benchmark, k, bits):
+    ms = list(mathlib.get_consecutive_primes(k, bits))
+    secret = mathlib.get_random_range(1, ms[0])
+    benchmark(mathlib.garner_algorithm, [secret % m for m in ms], ms)
+
+
+@pytest.mark.parametrize('bits', [64, 256, 512])
+def test_get_prime(benchmark, bits):
+    benchmark(mathlib.get_prime, bits)
+
+
+@pytest.mark.parametrize('bits', [64, 256])
+def test_get_consecutive_primes(benchmark, bits):
+    benchmark(lambda: list(mathlib.get_consecutive_primes(5, bits)))
+
+
+@pytest.mark.parametrize('minimum, shares', [(3, 6), (8, 16)])
+def test_shamir_split(benchmark, minimum, shares):
+    benchmark(shamir.make_random_shares, minimum, shares, SHAMIR_PRIME)
+
+
+@pytest.mark.parametrize('minimum, shares', [(3, 6), (8, 16)])
+def test_shamir_recover(benchmark, minimum, shares):
+    _, points = shamir.make_random_shares(minimum, shares, SHAMIR_PRIME)
+    benchmark(shamir.recover_secret, points[:minimum], SHAMIR_PRIME)
+
+
+@pytest.mark.parametrize('secrets', [1000, 100000])
+def test_get_ab_shares(benchmark, secrets):
+    m0, ms = 11 * 13 * 17, [17 * 223, 13 * 227, 11 * 229]
+    values = np.random.default_rng(0).integers(97, 123, size=secrets)
+    benchmark(get_ab_shares, values, m0, ms, np.random.default_rng(0))
+
+
+def test_secure_ab_shares_use_system_random(monkeypatch):
+    m0, ms = 11 * 13 * 17, [17 * 223, 13 * 227, 11 * 229]
+    randomness.configure(seed=0, secure=True)
+    monkeypatch.setattr(randomness, 'generator', None)  # must not be used
+    values = list(range(97, 123))
+    shares = get_ab_shares(values, m0, ms)
+    assert isinstance(randomness.python_random('ab_shares'),
+                      random.SystemRandom)
+    for value, residues in zip(values, shares):
+        y = mathlib.garner_algorithm([int(r) for r in residues], ms)
+        assert y % m0 == value and m0 < y < np.prod(ms)
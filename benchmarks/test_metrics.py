@@ -0,0 +1,16 @@
+from metrics import Metrics
+
+
+def test_prometheus_types():
+    metrics = Metrics()
+    metrics.add('characters', 10, worker=1)
+    metrics.add('characters', 5, worker=2)
+    metrics.maximum('queue_depth', 3, worker=1)
+    metrics.maximum('queue_depth', 2, worker=1)
+    assert metrics.to_prometheus().splitlines() == [
+        '# TYPE blind_characters counter',
+        'blind_characters{worker="1"} 10',
+        'blind_characters{worker="2"} 5',
+        '# TYPE blind_queue_depth gauge',
+        'blind_queue_depth{worker="1"} 3',
+    ]
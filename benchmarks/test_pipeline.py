@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from crt.generic_functions import get_mignotte_params
+from state_machine import compiler
+
+INPUT_LENGTH = 2**12
+INITIAL_STATE = 200
+
+
+@pytest.fixture(scope='module')
+def polys():
+    xy_s = compiler.points(main.generate_data())
+    _, ms = get_mignotte_params(xy_s, n=5, k=5)
+    return {
+        mod: poly.reduce(mod)
+        for mod, poly in main.interpolate_per_modulus(xy_s, ms).items()
+    }
+
+
+def report_throughput(benchmark, characters):
+    benchmark.extra_info['characters'] = characters
+    if benchmark.stats:  # None with --benchmark-disable
+        benchmark.extra_info['characters_per_second'] = \
+            characters / benchmark.stats.stats.mean
+
+
+def test_report_throughput_without_stats():
+    benchmark = SimpleNamespace(extra_info=dict(), stats=None)
+    report_throughput(benchmark, 100)  # as under --benchmark-disable
+    assert benchmark.extra_info == {'characters': 100}
+
+
+@pytest.mark.parametrize('documents', [1, 64])
+def test_main_workers(benchmark, monkeypatch, polys, documents):
+    monkeypatch.setattr(main, 'RANDOM_INPUT_LENGTH', INPUT_LENGTH)
+    benchmark.pedantic(main.run_workers,
+                       args=(polys, INITIAL_STATE, documents),
+                       rounds=3)
+    report_throughput(benchmark, INPUT_LENGTH * documents * len(polys))
+
+
+@pytest.mark.parametrize('chunks', [4, 16])
+def test_main_scan(benchmark, monkeypatch, polys, chunks):
+    monkeypatch.setattr(main, 'RANDOM_INPUT_LENGTH', INPUT_LENGTH * 16)
+    benchmark.pedantic(main.run_scan,
+                       args=(polys, INITIAL_STATE, chunks),
+                       rounds=3)
+    report_throughput(benchmark, INPUT_LENGTH * 16 * len(polys))
+
+
+def test_interpolate_per_modulus(benchmark):
+    xy_s = compiler.points(main.generate_data())
+    _, ms = get_mignotte_params(xy_s, n=5, k=5)
+    benchmark.pedantic(main.interpolate_per_modulus, args=(xy_s, ms), rounds=3)
@@ -0,0 +1,115 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+from polynomials import polyfile
+from polynomials.lagrange import lagrange
+from polynomials.polymod import Mod, PolyMod, SparsePolyMod
+
+MODULUS = 521 * 523 * 541 * 547 * 557
+
+
+@pytest.fixture(autouse=True)
+def modulus():
+    Mod.set_mod(MODULUS)
+
+
+def random_poly(degree):
+    return PolyMod([random.randrange(MODULUS) for _ in range(degree + 1)])
+
+
+def test_mod_mul(benchmark):
+    a, b = Mod(random.randrange(MODULUS)), Mod(random.randrange(MODULUS))
+    benchmark(a.__mul__, b)
+
+
+def test_mod_pow(benchmark):
+    benchmark(Mod(random.randrange(MODULUS)).__pow__, MODULUS - 2)
+
+
+def test_mod_inverse(benchmark):
+    benchmark(Mod(random.randrange(1, MODULUS)).inverse)
+
+
+@pytest.mark.parametrize('degree', [16, 64, 256])
+def test_polymod_call(benchmark, degree):
+    benchmark(random_poly(degree), random.randrange(MODULUS))
+
+
+@pytest.mark.parametrize('degree', [16, 64, 256])
+def test_polymod_evaluate_many(benchmark, degree):
+    Mod.set_mod(557)
+    benchmark(random_poly(degree).evaluate_many, range(557))
+
+
+@pytest.mark.parametrize('points', [8, 32, 64])
+def test_polymod_interpolate(benchmark, points):
+    xs = random.sample(range(500), points)  # differences invertible
+    benchmark(PolyMod.interpolate,
+              [(x, random.randrange(1000)) for x in xs])
+
+
+@pytest.mark.parametrize('points', [32, 256])
+def test_lagrange_modular_call(benchmark, points):
+    xs = random.sample(range(500), points)
+    f = lagrange([(x, random.randrange(557)) for x in xs], 557)
+    benchmark(f, random.randrange(557))
+
+
+@pytest.mark.parametrize('points', [32, 256])
+def test_lagrange_float_evaluate(benchmark, points):
+    f = lagrange([(x, random.random()) for x in range(points)])
+    benchmark(f.evaluate, np.linspace(0, points, 100))
+
+
+@pytest.mark.parametrize('points', [32, 256])
+def test_lagrange_modular_evaluate(benchmark, points):
+    xs = random.sample(range(500), points)
+    f = lagrange([(x, random.randrange(557)) for x in xs], 557)
+    result = benchmark(f.evaluate, range(557))
+    assert list(result) == [f(x) for x in range(557)]
+
+
+@pytest.mark.parametrize('points', [256, 1000])
+def test_lagrange_float_many_nodes(points):
+    ones = lagrange([(x, 1.0) for x in range(points)])
+    assert np.allclose(ones.evaluate(np.linspace(0, points - 1, 50)), 1)
+    line = lagrange([(x, 2.0 * x) for x in range(points)])
+    assert line(points / 2 + 0.5) == pytest.approx(points + 1)
+
+
+@pytest.mark.parametrize('degree', [16, 256, 1024])
+def test_polymod_mul(benchmark, degree):
+    benchmark(random_poly(degree).__mul__, random_poly(degree))
+
+
+@pytest.mark.parametrize('nonzero', [8, 64])
+def test_sparse_polymod_call(benchmark, nonzero):
+    terms = {e: random.randrange(MODULUS)
+             for e in random.sample(range(1024), nonzero)}
+    benchmark(SparsePolyMod(terms), random.randrange(MODULUS))
+
+
+def test_polyfile_round_trip(tmp_path):
+    path, key = str(tmp_path / 'p.poly'), b'k' * 32
+    p = random_poly(300)
+    polyfile.save(path, p, MODULUS, key)
+    assert [t.value for t in polyfile.load(path, MODULUS, key).terms] == \
+        [t.value for t in p.terms]
+    for prime in (521, 557):
+        Mod.set_mod(MODULUS)
+        expected = [t.value for t in p.reduce(prime).terms]
+        assert [t.value
+                for t in polyfile.reduced(path, prime).terms] == expected
+    assert polyfile.load(path, MODULUS, b'x' * 32) is None
+
+
+def test_polyfile_truncated_is_stale(tmp_path):
+    path = str(tmp_path / 'p.poly')
+    polyfile.save(path, random_poly(16), MODULUS, b'k' * 32)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 8)
+    assert polyfile.load(path) is None
+    assert not polyfile.is_current(path)
@@ -0,0 +1,184 @@
+"""
+Plans the boolean circuit that BGV_binary_modulo_reduction.cpp-style HElib
+code evaluates for one state machine step.
+
+Every state and symbol index is written in binary with each bit dual-rail
+encoded as a one-hot pair (0 -> 01, 1 -> 10), so a step is a blind_match
+table lookup from (state, symbol) to the next state and XOR can combine the
+matched entries. With p = 2 every ciphertext slot holds one bit, so each wire
+carries the same bit of `slots` independent documents (SIMD batching); the
+plaintext simulator models this by evaluating the gates on ints whose bit k
+is slot k.
+
+save() exports a plan as JSON for the C++ side: the gates in topological
+order (gate g drives wire width + g), which wires take the symbol and state
+rails, and the wires of the next state rails.
+"""
+import json
+from typing import Dict, List
+
+from blind_operations import circuit
+
+
+def dual_rail(value: int, bits: int) -> int:
+    return sum((2 if value >> b & 1 else 1) << 2 * b for b in range(bits))
+
+
+def from_dual_rail(x: int, bits: int) -> int:
+    return sum((x >> 2 * b + 1 & 1) << b for b in range(bits))
+
+
+def plan(machine, alphabet) -> Dict:
+    """Build the step circuit of a compiler-format machine
+    ({state: (transitions, output)})."""
+    states = list(machine)
+    state_bits = max(1, (len(states) - 1).bit_length())
+    symbol_bits = max(1, (len(alphabet) - 1).bit_length())
+    width = 2 * (state_bits + symbol_bits)
+    shift = 2 * symbol_bits  # the state sits above the symbol
+
+    table = [((dual_rail(states.index(state), state_bits) << shift)
+              | dual_rail(alphabet.index(c), symbol_bits),
+              dual_rail(states.index(dest), state_bits) << shift)
+             for state, (t, _) in machine.items() for c, dest in t.items()]
+    gates, outputs = circuit.generate(table, width)
+    return {
+        'states': states,
+        'alphabet': alphabet,
+        'state_bits': state_bits,
+        'symbol_bits': symbol_bits,
+        'width': width,
+        'transitions': len(table),
+        'gates': gates,
+        'outputs': outputs[shift:],  # next state wires
+    }
+
+
+def report(p: Dict) -> Dict:
+    gates = p['gates']
+    return {
+        'transitions': p['transitions'],
+        'input wires': p['width'],
+        'and gates': sum(op == 'and' for op, _, _ in gates),
+        'xor gates': sum(op == 'xor' for op, _, _ in gates),
+        'multiplicative depth per step': circuit.depth(gates, p['outputs'],
+                                                       p['width']),
+    }
+
+
+FORMAT_VERSION = 1
+
+
+def save(p: Dict, path: str, slots: int) -> None:
+    shift = 2 * p['symbol_bits']
+    with open(path, 'w') as f:
+        json.dump(
+            {
+                'format': FORMAT_VERSION,
+                'encoding': 'dual-rail, bit b on wires 2b (set for 0) and '
+                '2b + 1 (set for 1)',
+                'slots': slots,  # slot k of every wire is document k
+                'states': p['states'],
+                'alphabet': p['alphabet'],
+                'state_bits': p['state_bits'],
+                'symbol_bits': p['symbol_bits'],
+                'width': p['width'],
+                'transitions': p['transitions'],
+                'depth': circuit.depth(p['gates'], p['outputs'], p['width']),
+                'inputs': {
+                    'symbol': list(range(shift)),
+                    'state': list(range(shift, p['width'])),
+                },
+                'gates': [list(gate) for gate in p['gates']],
+                'outputs': p['outputs'],  # next state rails, null is 0
+            }, f)
+
+
+def load(path: str) -> Dict:
+    """Read a plan written by save(), e.g. to simulate() it."""
+    with open(path) as f:
+        spec = json.load(f)
+    if spec['format'] != FORMAT_VERSION:
+        raise Exception(f'{path} has format {spec["format"]}, expected '
+                        f'{FORMAT_VERSION}')
+    p = {
+        k: spec[k]
+        for k in ('states', 'alphabet', 'state_bits', 'symbol_bits', 'width',
+                  'transitions', 'outputs')
+    }
+    p['gates'] = [tuple(gate) for gate in spec['gates']]
+    return p
+
+
+def to_slots(xs: List[int], width: int) -> List[int]:
+    """Transpose packed values (one per slot) into per-wire slot vectors."""
+    return [
+        sum((x >> i & 1) << k for k, x in enumerate(xs)) for i in range(width)
+    ]
+
+
+def from_slots(wires: List[int], slots: int) -> List[int]:
+    return [sum((w >> k & 1) << i for i, w in enumerate(wires))
+            for k in range(slots)]
+
+
+def simulate(p: Dict, initial, documents: List[str]) -> List:
+    """Run equal-length documents through the circuit, one slot each, and
+    return the final state of every document."""
+    symbol_bits, shift = p['symbol_bits'], 2 * p['symbol_bits']
+    start = dual_rail(p['states'].index(initial), p['state_bits'])
+    state_wires = to_slots([start] * len(documents), 2 * p['state_bits'])
+    for column in zip(*documents):
+        symbols = to_slots([
+            dual_rail(p['alphabet'].index(c), symbol_bits) for c in column
+        ], shift)
+        wires = circuit.run(p['gates'], symbols + state_wires)
+        state_wires = [0 if w is None else wires[w] for w in p['outputs']]
+    return [
+        p['states'][from_dual_rail(x, p['state_bits'])]
+        for x in from_slots(state_wires, len(documents))
+    ]
+
+
+def main():
+    import argparse
+
+    import randomness
+    from main import ALPHABET
+    from state_machine import compiler
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('machine_file', metavar='MACHINE.json')
+    parser.add_argument('--slots', type=int, default=336)
+    parser.add_argument('--length', type=int, default=64)
+    parser.add_argument('--out',
+                        metavar='CIRCUIT.json',
+                        help='export the circuit for the HElib side')
+    args = parser.parse_args()
+
+    machine, initial = compiler.load(args.machine_file, ALPHABET)
+    p = plan(machine, list(ALPHABET))
+    for name, value in report(p).items():
+        print(f'{name}: {value}')
+    if args.out:
+        save(p, args.out, args.slots)
+
+    rng = randomness.generator('documents')
+    documents = [
+        ''.join(ALPHABET[i] for i in rng.integers(len(ALPHABET),
+                                                  size=args.length))
+        for _ in range(args.slots)
+    ]
+    expected = list()
+    for document in documents:
+        state = initial
+        for c in document:
+            state = machine[state][0][c]
+        expected += [state]
+    actual = simulate(p, initial, documents)
+    print(f'simulated {args.slots} slots x {args.length} steps: '
+          f'{"ok" if actual == expected else "MISMATCH"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import numpy as np
 from bitstring import BitArray
 
 T = [
@@ -6,17 +7,83 @@ T = [
 ]  # must be hashable
 
 
+WIDTH = len(T[0][0])
+
+
+def pairs_mask(width: int) -> int:
+    return int('01' * (width // 2), 2)  # low bit of every pair
+
+
+PAIRS_MASK = pairs_mask(WIDTH)
+T_PACKED = [(current_state.uint, next_state.uint)
+            for current_state, next_state in T]
+
+
+def match_packed(x: int, table=T_PACKED, width: int = WIDTH) -> int:
+    """Scan a table of packed states of the given width (in bits)."""
+    mask, res = pairs_mask(width), 0
+    for current_state, next_state in table:
+        if current_state >> width:
+            raise ValueError(f'{current_state:b} is wider than {width} bits')
+        overlap = x & current_state
+        if (overlap | overlap >> 1) & mask == mask:  # every pair
+            res |= next_state
+    return res
+
+
+def is_one_hot(x: int, width: int = WIDTH) -> bool:
+    mask = pairs_mask(width)
+    return (x ^ x >> 1) & mask == mask  # every pair is 01 or 10
+
+
+def build_index(table, width: int = WIDTH):
+    """Split a table into a dict of its one-hot entries and a list of the
+    rest (entries with wildcard 11 pairs), which must still be scanned."""
+    index, rest = dict(), list()
+    for current_state, next_state in table:
+        if current_state >> width:
+            raise ValueError(f'{current_state:b} is wider than {width} bits')
+        if is_one_hot(current_state, width):
+            index[current_state] = index.get(current_state, 0) | next_state
+        else:
+            rest += [(current_state, next_state)]
+    return index, rest
+
+
+T_INDEX, T_REST = build_index(T_PACKED)
+
+
+def lookup(x: int, index=T_INDEX, rest=T_REST, width: int = WIDTH) -> int:
+    """Match through the hashed table - a one-hot state matches exactly one
+    one-hot entry, the one equal to it, plus any wildcard entries; anything
+    else falls back to the full scan. width is the one build_index was
+    given."""
+    if is_one_hot(x, width):
+        return index.get(x, 0) | match_packed(x, rest, width)
+    return match_packed(x, rest + list(index.items()), width)
+
+
+def match_many(xs: np.ndarray, table=T_PACKED,
+               width: int = WIDTH) -> np.ndarray:
+    """Match an array of packed states (up to 64 bits) at once."""
+    if width > 64:
+        raise ValueError(f'{width} bits do not fit in uint64')
+    if any(current_state >> width for current_state, _ in table):
+        raise ValueError(f'the table is wider than {width} bits')
+    xs = np.asarray(xs, dtype=np.uint64)
+    current_states, next_states = (np.array(column, dtype=np.uint64)
+                                   for column in zip(*table))
+    mask = np.uint64(pairs_mask(width))
+    overlap = xs[:, np.newaxis] & current_states
+    matched = (overlap | overlap >> np.uint64(1)) & mask == mask
+    return np.bitwise_or.reduce(np.where(matched, next_states, np.uint64(0)),
+                                axis=1)
+
+
 def match(x: str) -> str:
-    x = BitArray(bin=x)
-    res = BitArray(length=len(x))
-    for current_state, next_state in T:
-        tmp = BitArray(bin='1')
-        for i in range(len(x))[::2]:
-            tmp = tmp & BitArray(bool=x[i] & current_state[i]
-                                 | x[i + 1] & current_state[i + 1])
-        res |= (tmp * len(next_state)) & next_state
-
-    return res.bin
+    if len(x) != WIDTH:
+        raise ValueError(f'expected {WIDTH} bits, got {len(x)}')
+    return BitArray(uint=lookup(BitArray(bin=x).uint), length=WIDTH).bin
 
 
 def main() -> None:
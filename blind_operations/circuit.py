@@ -0,0 +1,112 @@
+"""
+Oblivious boolean circuit for a blind_match transition table.
+
+Wires 0..width-1 are the input bits (bit i of the packed state) and gate g
+drives wire width + g. Gates are ('and', a, b) or ('xor', a, b), the
+operations BGV offers natively over GF(2) (multiplication and addition).
+"""
+import functools
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+Gate = Tuple[str, int, int]
+
+
+class Builder:
+    def __init__(self, width: int):
+        self.width = width
+        self.gates: List[Gate] = []
+        self.depths: List[int] = [0] * width  # multiplicative depth per wire
+        self._cache: Dict[Gate, int] = dict()  # share equal sub-circuits
+
+    def gate(self, op: str, a: int, b: int) -> int:
+        key = (op, min(a, b), max(a, b))
+        if key not in self._cache:
+            self.gates.append(key)
+            self.depths.append(
+                max(self.depths[a], self.depths[b]) + (op == 'and'))
+            self._cache[key] = self.width + len(self.gates) - 1
+        return self._cache[key]
+
+    def or_(self, a: int, b: int) -> int:
+        return self.gate('xor', self.gate('xor', a, b), self.gate('and', a, b))
+
+    def tree(self, op, wires: List[int]) -> Optional[int]:
+        """Combine wires, always joining the two shallowest ones, which gives
+        a tree of minimal depth (ceil(log2(len(wires))) for equal depths)."""
+        heap = [(self.depths[w], w) for w in wires]
+        heapq.heapify(heap)
+        while len(heap) > 1:
+            (_, a), (_, b) = heapq.heappop(heap), heapq.heappop(heap)
+            c = op(a, b)
+            heapq.heappush(heap, (self.depths[c], c))
+        return heap[0][1] if heap else None
+
+
+def generate(table: List[Tuple[int, int]],
+             width: int,
+             exclusive: bool = True) -> Tuple[List[Gate], List[Optional[int]]]:
+    """Return (gates, outputs) where outputs[i] is the wire of output bit i,
+    or None when it is constant 0.
+
+    With exclusive=True the inputs are assumed to be one-hot pairs, so at
+    most one one-hot entry matches and their next states are combined with
+    XOR, which costs no multiplicative depth. Entries with wildcard (11)
+    pairs may fire alongside it and are always combined with OR."""
+    builder = Builder(width)
+    and_ = functools.partial(builder.gate, 'and')
+    combine = functools.partial(builder.gate, 'xor') if exclusive \
+        else builder.or_
+
+    merged: Dict[int, int] = dict()  # equal entries fire together
+    for current_state, next_state in table:
+        merged[current_state] = merged.get(current_state, 0) | next_state
+
+    matches = list()  # (wire, next state, one-hot)
+    for current_state, next_state in merged.items():
+        terms, one_hot = list(), True
+        for low in range(0, width, 2):
+            bits = [i for i in (low, low + 1) if current_state >> i & 1]
+            if not bits:
+                break  # the pair can never overlap, the entry never fires
+            terms += [bits[0] if len(bits) == 1 else builder.or_(*bits)]
+            one_hot = one_hot and len(bits) == 1
+        else:
+            matches += [(builder.tree(and_, terms), next_state, one_hot)]
+
+    outputs = list()
+    for i in range(width):
+        fired = [(wire, one_hot) for wire, next_state, one_hot in matches
+                 if next_state >> i & 1]
+        exclusive_wire = builder.tree(
+            combine, [wire for wire, one_hot in fired if one_hot])
+        outputs += [
+            builder.tree(builder.or_,
+                         [wire for wire, one_hot in fired if not one_hot] +
+                         ([] if exclusive_wire is None else [exclusive_wire]))
+        ]
+    return builder.gates, outputs
+
+
+def run(gates: List[Gate], inputs: List[int]) -> List[int]:
+    """Return the values of all wires. Inputs may be ints of any width, in
+    which case every bit position is evaluated independently (bit-slicing)."""
+    wires = list(inputs)
+    for op, a, b in gates:
+        wires += [wires[a] & wires[b] if op == 'and' else wires[a] ^ wires[b]]
+    return wires
+
+
+def depth(gates: List[Gate], outputs: List[Optional[int]], width: int) -> int:
+    """Multiplicative (AND) depth of the circuit."""
+    depths = [0] * width
+    for op, a, b in gates:
+        depths += [max(depths[a], depths[b]) + (op == 'and')]
+    return max((depths[w] for w in outputs if w is not None), default=0)
+
+
+def evaluate(gates: List[Gate], outputs: List[Optional[int]], x: int,
+             width: int) -> int:
+    """Plaintext simulation of the circuit on a packed state."""
+    wires = run(gates, [x >> i & 1 for i in range(width)])
+    return sum(wires[w] << i for i, w in enumerate(outputs) if w is not None)
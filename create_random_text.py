@@ -1,19 +1,94 @@
 #!/usr/bin/python3
-import random
-import string
-from progressbar import progressbar
+"""
+Random text corpus over main.ALPHABET, for fixtures of realistic size.
+
+The file is made of BLOCK_SIZE blocks, block i drawn from the 'corpus'
+stream of worker i (see randomness), so the output only depends on the size
+and the seed - not on how many processes wrote it.
+"""
+import multiprocessing
+
+import numpy as np
+
+import randomness
+from main import ALPHABET, encode
+
+BLOCK_SIZE = 8 * 1024**2
+FILE_LENGTH = 50 * 1024**2
+ALPHABET_BYTES = np.frombuffer(ALPHABET.encode('ascii'), dtype=np.uint8)
+ENCODING = np.zeros(256, dtype=np.uint8)  # byte -> encode(character)
+ENCODING[ALPHABET_BYTES] = [encode(c) for c in ALPHABET]
+
+SIZE_SUFFIXES = {'K': 1024, 'M': 1024**2, 'G': 1024**3}
+
+
+def parse_size(text):
+    suffix = text[-1:].upper()
+    if suffix in SIZE_SUFFIXES:
+        return int(text[:-1]) * SIZE_SUFFIXES[suffix]
+    return int(text)
+
+
+def block(index, size=BLOCK_SIZE):
+    rng = np.random.default_rng(randomness.seed_sequence('corpus', index))
+    return ALPHABET_BYTES[rng.integers(len(ALPHABET_BYTES),
+                                       size=size,
+                                       dtype=np.uint8)]
+
+
+def write_blocks(path, size, indices):
+    with open(path, 'r+b') as f:
+        for i in indices:
+            offset = i * BLOCK_SIZE
+            f.seek(offset)
+            f.write(block(i, min(BLOCK_SIZE, size - offset)).tobytes())
+
+
+def generate(path, size=FILE_LENGTH, jobs=1):
+    with open(path, 'wb') as f:
+        f.truncate(size)
+    blocks = range(-(-size // BLOCK_SIZE))
+    if jobs == 1:
+        write_blocks(path, size, blocks)
+        return
+    with multiprocessing.Pool(jobs) as pool:
+        pool.starmap(write_blocks,
+                     [(path, size, blocks[j::jobs]) for j in range(jobs)])
+
+
+def load(path, chunk_size=BLOCK_SIZE):
+    """Yield the corpus in chunks, encoded the way main.encode does (as
+    uint8), without holding more than one chunk in memory."""
+    corpus = np.memmap(path, dtype=np.uint8, mode='r')
+    for lo in range(0, len(corpus), chunk_size):
+        yield ENCODING[corpus[lo:lo + chunk_size]]
 
-LINE_LENGTH = 100
-FILE_LENGTH = 50 * 1024 ** 2
 
 def main():
-    number_of_lines = FILE_LENGTH // LINE_LENGTH
-    with open('some_text.txt', 'w') as f:
-        for _ in progressbar(range(number_of_lines)):
-            f.write(''.join(random.choices(string.ascii_letters + '. ', k=random.randrange(LINE_LENGTH))) + '\n')
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size',
+                        type=parse_size,
+                        default=FILE_LENGTH,
+                        help='bytes, optionally suffixed with K, M or G')
+    parser.add_argument('--seed',
+                        type=int,
+                        help='make the corpus reproducible')
+    parser.add_argument('--secure-random',
+                        action='store_true',
+                        help='draw from the OS entropy pool instead')
+    parser.add_argument('--output', default='some_text.txt')
+    parser.add_argument('--jobs',
+                        type=int,
+                        default=1,
+                        help='write the blocks from this many processes')
+    args = parser.parse_args()
+    randomness.configure(args.seed, args.secure_random)
+
+    generate(args.output, args.size, args.jobs)
     print('Done!')
 
 
 if __name__ == '__main__':
     main()
-
@@ -1,12 +1,11 @@
-import random
-
 import numpy as np
 
+import randomness
 from secret_sharing.mathlib import garner_algorithm
 
 
 def damage_r(r):
-    i = random.randrange(len(r))
+    i = randomness.python_random('error_correct').randrange(len(r))
     r[i] += 1
 
 
@@ -25,7 +24,8 @@ def main():
     pn = pk + [7, 11, 13]
     n = int(np.prod(pn))
     e = pn[-1]
-    x = random.randint(int(np.sqrt(k)) + 1, k)**2
+    x = randomness.python_random('error_correct').randint(
+        int(np.sqrt(k)) + 1, k)**2
     print(f'x={x}, k={k}, n={n}, e={e}')
     r = [x % p for p in pn]
     print(f'r={r}')
@@ -1,40 +1,39 @@
+import functools
+import hashlib
 import itertools
-import random
+import json
+import math
+import multiprocessing
+import os
 
 import numpy as np
-import primefac
+
+import randomness
+from polynomials.lagrange import Barycentric
+from secret_sharing import mathlib
+
+SEARCH_CHUNK = 4096  # combinations per task
+
+_params_cache = dict()  # (fingerprint, n, k) -> (authorized range, ms)
 
 
 def xgcd(a, b):
     """return (g, x, y) such that a*x + b*y = g = gcd(a, b)"""
-    x0, x1, y0, y1 = 0, 1, 1, 0
-    while a != 0:  # TODO: use numpy's functionality
-        q, b, a = b // a, a, b % a
-        y0, y1 = y1, y0 - (q * y1)
-        x0, x1 = x1, x0 - (q * x1)
-    return b, x0, y0
+    return mathlib.exgcd(a, b)
 
 
 def mulinv(a, b):
     """return x such that (x * a) % b == 1"""
-    g, x, _ = xgcd(a, b)
-    if g == 1:
-        return x % b
+    try:
+        return mathlib.inverse(a % b, b)
+    except ValueError:
+        return None
 
 
 def lagrange(x, w, ff):
-    M = len(x)
-    p = np.mod(np.poly1d(0.0), ff)
-    for j in range(M):
-        pt = np.mod(np.poly1d(w[j]), ff)
-        for k in range(M):
-            if k == j:
-                continue
-            fac_inv = mulinv(np.mod(x[j] - x[k], ff), ff)
-            tmp = np.mod(np.mod(np.poly1d([1.0, -x[k]]), ff) * fac_inv, ff)
-            pt = np.mod(pt * tmp, ff)
-        p = np.mod(p + pt, ff)
-    return p
+    """return the interpolating polynomial of (x, w) modulo ff - evaluated
+    exactly by calling it, see Barycentric.coefficients() for its terms"""
+    return Barycentric(list(zip(x, w)), ff)
 
 
 def generate_primes(limit, start_from=2):
@@ -44,36 +43,155 @@ def generate_primes(limit, start_from=2):
                               int(round(np.sqrt(x))) + 1, 2) if not x % t]))
 
 
-def get_authorized_range(primes, n, k):
-    from sys import stdout
-    assert k <= n
-    for i, candidates in enumerate(
-        (itertools.combinations(primes, n))):  # 'choose' behavior
-        stdout.write(f'{i:,}\r')  # iteration number
-        ms = sorted(candidates)
-        beta = int(np.prod(ms[-k + 1:]))
-        alpha = int(np.prod(ms[:k], dtype=np.int64))
+def _authorized(candidates, k):
+    """return the first authorized sequence among the candidates, if any"""
+    for candidate in candidates:
+        ms = sorted(candidate)
+        beta = math.prod(ms[-k + 1:])
+        alpha = math.prod(ms[:k])
         if beta < alpha:
-            return range(beta + 1, alpha), ms  # array is authorized
+            return ms
+    return None
+
 
-    raise Exception('failed to find primes - consider a higher limit')
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    return iter(lambda: list(itertools.islice(iterator, size)), [])
+
+
+def get_authorized_range(primes, n, k, processes=None):
+    """search the n-combinations of primes, in order, for an authorized
+    sequence. The first chunk is tried in-process, as it usually succeeds;
+    after that waves of chunks go to a process pool and the search stops at
+    the first wave that finds one"""
+    from sys import stdout
+    assert k <= n
+    # when any sequence is authorized, so is one of n consecutive primes
+    # (moving the primes above the k-th down and the ones below it up only
+    # helps), which makes an unsatisfiable search fail without walking all
+    # the combinations
+    primes = list(primes)
+    ordered = sorted(primes)
+    windows = (ordered[i:i + n] for i in range(len(ordered) - n + 1))
+    if _authorized(windows, k) is None:
+        raise Exception('failed to find primes - consider a higher limit')
+
+    chunks = _chunks(itertools.combinations(primes, n),
+                     SEARCH_CHUNK)  # 'choose' behavior
+    ms = _authorized(next(chunks, []), k)
+    if ms is None:
+        processes = processes or os.cpu_count()
+        with multiprocessing.Pool(processes) as pool:
+            for i in itertools.count(1):
+                wave = [
+                    pool.apply_async(_authorized, (chunk, k))
+                    for chunk in itertools.islice(chunks, processes)
+                ]
+                if not wave:
+                    break
+                stdout.write(f'{i * processes * SEARCH_CHUNK:,}\r')
+                ms = next((ms for ms in (r.get() for r in wave) if ms), None)
+                if ms is not None:
+                    break  # leaving the pool terminates the other workers
+    if ms is None:
+        raise Exception('failed to find primes - consider a higher limit')
+    beta, alpha = math.prod(ms[-k + 1:]), math.prod(ms[:k])
+    return range(beta + 1, alpha), ms  # array is authorized
+
+
+@functools.lru_cache(maxsize=None)
+def _ab_product(co_primes):
+    return math.prod(co_primes)  # exact, unlike an int64 np.prod
 
 
 def get_ab_share(secret, m0, co_primes):
-    prod = np.prod(co_primes, dtype=np.int64)
+    prod = _ab_product(tuple(co_primes))
     q_param = (prod - secret) // m0
-    alpha_param = random.randint(1, q_param)
+    alpha_param = randomness.python_random('ab_shares').randint(1, q_param)
     result = secret + alpha_param * m0
 
     return result
 
 
-def get_mignotte_params(xy_s, n=3, k=3):
-    xs = xy_s.keys()
-    diffs = set([abs(x1 - x2) for x1 in xs for x2 in xs if x1 != x2])
-    factors = set(
-        itertools.chain.from_iterable([primefac.primefac(d) for d in diffs]))
-
-    return get_authorized_range(
-        itertools.islice((p for p in generate_primes(1000, start_from=200) if p not in factors),
-                         k), n, k)
+def get_ab_shares(secrets, m0, co_primes, rng=None):
+    """return the (len(secrets), len(co_primes)) matrix of Asmuth-Bloom
+    residues, drawing the alpha of every secret at once - or one by one from
+    a SystemRandom when randomness.secure() and no rng is given"""
+    if rng is None and not randomness.secure():
+        rng = randomness.generator('ab_shares')
+    prod = _ab_product(tuple(co_primes))
+    if rng is None:  # PCG64 is not a cryptographic generator
+        rnd = randomness.python_random('ab_shares')
+        ys = np.array([
+            s + rnd.randint(1, (prod - s) // m0) * m0
+            for s in map(int, secrets)
+        ],
+                      dtype=object)
+    elif prod <= np.iinfo(np.int64).max:
+        secrets = np.asarray(secrets, dtype=np.int64)
+        alphas = rng.integers(1, (prod - secrets) // m0, endpoint=True)
+        ys = secrets + alphas * m0
+    else:  # exact python integers, with a negligible modulo bias
+        size = (prod // m0).bit_length() // 8 + 9
+        ys = np.array([
+            s + (1 + int.from_bytes(rng.bytes(size), 'little') %
+                 ((prod - s) // m0)) * m0 for s in map(int, secrets)
+        ],
+                      dtype=object)
+    residues = ys[:, np.newaxis] % np.array(co_primes, dtype=ys.dtype)
+    if max(co_primes) <= np.iinfo(np.int64).max:
+        return residues.astype(np.int64)
+    return residues
+
+
+def fingerprint(xy_s):
+    """sha256 of the x values, the only part of the table the parameters
+    depend on"""
+    return hashlib.sha256(','.join(map(str, sorted(xy_s))).encode()).digest()
+
+
+def _load_params(path):
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except FileNotFoundError:
+        return
+    for key, (start, stop, ms) in cached.items():
+        digest, n, k = key.split(':')
+        _params_cache[(bytes.fromhex(digest), int(n),
+                       int(k))] = (range(start, stop), ms)
+
+
+def _save_params(path):
+    cached = {
+        f'{digest.hex()}:{n}:{k}': [r.start, r.stop, ms]
+        for (digest, n, k), (r, ms) in _params_cache.items()
+    }
+    with open(path + '.tmp', 'w') as f:
+        json.dump(cached, f)
+    os.replace(path + '.tmp', path)
+
+
+def get_mignotte_params(xy_s, n=3, k=3, processes=None, cache_path=None):
+    """cache_path keeps the parameters across runs in a JSON file, keyed on
+    the fingerprint, n and k"""
+    key = (fingerprint(xy_s), n, k)
+    if key not in _params_cache and cache_path:
+        _load_params(cache_path)
+    if key in _params_cache:
+        return _params_cache[key]
+
+    try:
+        xs = np.array(list(xy_s), dtype=np.int64)
+    except OverflowError:
+        xs = np.array(list(xy_s), dtype=object)
+
+    def allowed(p):  # p divides no difference of x values
+        return len(np.unique(xs % p)) == len(xs)
+
+    _params_cache[key] = get_authorized_range(
+        (p for p in generate_primes(1000, start_from=200) if allowed(p)), n,
+        k, processes)
+    if cache_path:
+        _save_params(cache_path)
+    return _params_cache[key]
@@ -1,45 +1,154 @@
+"""
+Histogram of the secrets reachable from known shares and one unknown share.
+
+    count KNOWN.dat... UNKNOWN.dat FIELD [--part I/N] [--output OUT.dat]
+    merge OUT.dat PART.dat...
+
+Counts go straight into an int64 memmap. Every CHECKPOINT_EVERY combinations
+of known shares the position in the product space is saved next to it
+(OUT.dat.ckpt) together with the new values of the cells the batch touched,
+in one rename, and only then written to the memmap. Re-applying those values
+is idempotent, so an interrupted count resumes from the checkpoint without
+counting a batch twice. The checkpoint also records a fingerprint of the
+shares, the field and the part, and a run with other inputs refuses to
+resume it. --part I/N counts every N-th combination only, so the work can be
+split across processes or machines and the parts merged afterwards.
+"""
+import hashlib
 import itertools
+import os
 from sys import stdout
 
 import numpy as np
 
-from crr.mathlib import garner_algorithm
-from crr.polymod import Mod
+from secret_sharing.mathlib import garner_algorithm
 
+CHECKPOINT_EVERY = 1000
+MERGE_BLOCK = 2**20
 
-def main():
-    import argparse
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument('known_shares_files', nargs='+', metavar='MOD.dat')
-    parser.add_argument('unknown_shares_file', metavar='MOD.dat')
-    parser.add_argument('field_modulo', type=int)
+def open_histogram(path, size, resume=False):
+    return np.memmap(path,
+                     dtype=np.int64,
+                     mode='r+' if resume else 'w+',
+                     shape=size)
+
+
+def fingerprint(shares, field_modulo, part, parts):
+    h = hashlib.sha256(f'{field_modulo}:{part}/{parts};'.encode())
+    for values, mod in shares:
+        h.update(f'{mod}:'.encode())
+        h.update(np.asarray(values, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+def read_checkpoint(path, key):
+    """Return the position to resume from and the cells to restore."""
+    try:
+        checkpoint = np.load(path + '.ckpt')
+    except FileNotFoundError:
+        return 0, None
+    if str(checkpoint['fingerprint']) != key:
+        raise Exception(f'{path} was counted from other shares, field or '
+                        f'part - remove {path}.ckpt or pick another --output')
+    return int(checkpoint['next']), (checkpoint['cells'],
+                                     checkpoint['values'])
+
+
+def write_checkpoint(path, key, position, cells, values):
+    with open(path + '.ckpt.tmp', 'wb') as f:
+        np.savez(f,
+                 fingerprint=key,
+                 next=position,
+                 cells=cells,
+                 values=values)
+    os.replace(path + '.ckpt.tmp', path + '.ckpt')  # atomic
+
+
+def apply_batch(secrets, path, key, position, pending):
+    """Checkpoint the batch's resulting cell values, then write them."""
+    cells, counts = np.unique(np.array(pending, dtype=np.int64),
+                              return_counts=True)
+    values = secrets[cells] + counts
+    write_checkpoint(path, key, position, cells, values)
+    secrets[cells] = values
+    secrets.flush()
 
-    args = parser.parse_args()
 
+def count(known_shares_files, unknown_shares_file, field_modulo, output,
+          part=0, parts=1):
     def extract_shares(shares_file):
         freq = np.memmap(shares_file, mode='r', dtype=np.int64)
         return np.where(freq != 0)[0], np.size(freq)
 
     known_shares_col, known_mods = zip(
-        *[extract_shares(sf) for sf in args.known_shares_files])
-    unknown_shares, unknown_mod = extract_shares(args.unknown_shares_file)
-
-    secrets = np.zeros(args.field_modulo)
-    Mod.set_mod(args.field_modulo)
-    for shares_prod in itertools.product(*known_shares_col):
-        for i, share in enumerate(unknown_shares):
-            stdout.write(f'i={i}/{unknown_mod}\r')
-            res = garner_algorithm(shares_prod + (share, ),
-                                   known_mods + (unknown_mod, ))
-            secrets[Mod(res).value] += 1
-
-    fp = np.memmap(f'{args.field_modulo}.dat',
-                   dtype=np.int64,
-                   mode='w+',
-                   shape=np.size(secrets))
-    fp[:] = secrets[:]  # copy all values
-    fp.flush()
+        *[extract_shares(sf) for sf in known_shares_files])
+    unknown_shares, unknown_mod = extract_shares(unknown_shares_file)
+    mods = known_mods + (unknown_mod, )
+
+    key = fingerprint(
+        list(zip(known_shares_col, known_mods)) +
+        [(unknown_shares, unknown_mod)], field_modulo, part, parts)
+    start, restore = read_checkpoint(output, key)
+    secrets = open_histogram(output, field_modulo, resume=start > 0)
+    if restore is not None:  # the last batch may not have reached the memmap
+        cells, values = restore
+        secrets[cells] = values
+    combinations = itertools.islice(
+        itertools.product(*known_shares_col), start, None)
+    pending, position = list(), start - 1
+    for position, shares_prod in enumerate(combinations, start):
+        if position % parts == part:
+            stdout.write(f'combination={position}\r')
+            shares_prod = tuple(int(s) for s in shares_prod)
+            pending += [
+                garner_algorithm(shares_prod + (int(share), ), mods) %
+                field_modulo for share in unknown_shares
+            ]
+        if (position + 1) % CHECKPOINT_EVERY == 0:
+            apply_batch(secrets, output, key, position + 1, pending)
+            pending = list()
+    apply_batch(secrets, output, key, position + 1, pending)
+
+
+def merge(output, part_files):
+    parts = [np.memmap(p, dtype=np.int64, mode='r') for p in part_files]
+    merged = open_histogram(output, np.size(parts[0]))
+    for lo in range(0, np.size(merged), MERGE_BLOCK):
+        hi = lo + MERGE_BLOCK
+        merged[lo:hi] = sum(p[lo:hi] for p in parts)
+    merged.flush()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    count_parser = commands.add_parser('count')
+    count_parser.add_argument('known_shares_files',
+                              nargs='+',
+                              metavar='MOD.dat')
+    count_parser.add_argument('unknown_shares_file', metavar='MOD.dat')
+    count_parser.add_argument('field_modulo', type=int)
+    count_parser.add_argument('--part', default='0/1', metavar='I/N')
+    count_parser.add_argument('--output', metavar='OUT.dat')
+
+    merge_parser = commands.add_parser('merge')
+    merge_parser.add_argument('output', metavar='OUT.dat')
+    merge_parser.add_argument('part_files', nargs='+', metavar='PART.dat')
+
+    args = parser.parse_args()
+    if args.command == 'merge':
+        merge(args.output, args.part_files)
+        return
+
+    part, parts = map(int, args.part.split('/'))
+    output = args.output or (f'{args.field_modulo}.dat' if parts == 1 else
+                             f'{args.field_modulo}.part{part}.dat')
+    count(args.known_shares_files, args.unknown_shares_file,
+          args.field_modulo, output, part, parts)
 
 
 if __name__ == '__main__':
@@ -1,31 +1,38 @@
-import itertools
-import matplotlib
+import math
 import multiprocessing
+import os
 import numpy as np
-import pickle
-import random
 import string
-import time
 from timeit import default_timer as timer
-from tqdm import tqdm
-from transitions.extensions import GraphMachine as Machine
-from transitions.extensions.states import add_state_features, Tags
 
 from crt.generic_functions import get_mignotte_params
+from metrics import Metrics
+import randomness
 from secret_sharing.mathlib import garner_algorithm
+from state_machine import compiler
+from polynomials import polyfile
+from polynomials.lagrange import Barycentric
 from polynomials.polymod import PolyMod, Mod
 
-matplotlib.use('Agg')
-
 RANDOM_INPUT_LENGTH = 2**15
 QUEUE_MAX_SIZE = 100
+POLY_FILE = 'p.poly'
+PARAMS_FILE = 'mignotte.json'  # Mignotte parameters by table fingerprint
+BATCH_BLOCK_LENGTH = 256
+ALPHABET = string.ascii_lowercase + '. \n'
+
+METRICS = Metrics(enabled=False)  # enabled by --metrics/--metrics-port
+_stages = list()  # started and not yet done
+
 
 def print_done(start_val):
     elapsed = timer() - start_val
+    METRICS.span(_stages.pop(), elapsed)
     print('< done! time elapsed: [{:.2f}] seconds'.format(elapsed))
 
 
 def print_start(msg):
+    _stages.append(msg)
     print('> starting {:s}...'.format(msg))
 
 
@@ -49,8 +56,9 @@ def encode(character):
 
 
 def generate_data():
+    rng = randomness.generator('generate_data')  # output bits
     data = {
-        k: (dict(), random.randint(0, 1))
+        k: (dict(), int(rng.integers(2)))
         for k in {200, 400, 600, 800, 900}
     }
 
@@ -81,93 +89,160 @@ def generate_data():
     return data
 
 
+def transition_table(poly, mod):
+    """Tabulate p over Z_mod - p induces a map on the residues of a prime."""
+    Mod.set_mod(mod)
+    return poly.evaluate_many(np.arange(mod))
+
+
+def interpolate_modulo(points, mod):
+    Mod.set_mod(mod)
+    return PolyMod(Barycentric(points, mod).coefficients())
+
+
+def interpolate_per_modulus(xy_s, mods):
+    """Interpolate the transition points modulo every modulus, in parallel."""
+    with multiprocessing.Pool(len(mods)) as pool:
+        interpolants = pool.starmap(interpolate_modulo,
+                                    [(list(xy_s.items()), mod) for mod in mods])
+    return dict(zip(mods, interpolants))
+
+
+def combine_polynomials(interpolants, modulus):
+    """Combine per-modulus interpolants coefficient-wise with Garner's
+    algorithm into the polynomial over the product of the moduli."""
+    mods = list(interpolants)
+    length = max(len(poly) for poly in interpolants.values())
+    coefficients = [
+        garner_algorithm([
+            poly.terms[i].value if i < len(poly) else 0
+            for poly in interpolants.values()
+        ], mods) for i in range(length)
+    ]
+    Mod.set_mod(modulus)
+    return PolyMod(coefficients)
+
+
 def worker(poly, mod, current_state, input_q, results_q):
     Mod.set_mod(mod)
+    poly = PolyMod.compact(poly)
     next_state = current_state
+    counters = {'items': 0, 'blocked_seconds': 0, 'evaluation_seconds': 0}
     while True:
+        start = timer()
         item = input_q.get(block=True)
+        got = timer()
+        counters['blocked_seconds'] += got - start
         if item is None:  # stop
             input_q.task_done()
             break
         next_state = poly(next_state +
                           item).value  # modulo will already be applied here
+        counters['evaluation_seconds'] += timer() - got
+        counters['items'] += 1
         input_q.task_done()
 
-    results_q.put_nowait((next_state, mod))
+    results_q.put_nowait((next_state, mod, counters))
 
 
-def main():
-    print_start('state machine data generation')
-    start = timer()
-    transitions = generate_data()
-
-    xy_s = {
-        x: y
-        for (x, y) in itertools.chain.from_iterable(
-            [(src + i, t[0].get(i)) for i in t[0].keys()]
-            for src, t in transitions.items())
-    }
+def batch_worker(poly, mod, current_states, input_q, results_q):
+    table = transition_table(poly, mod)
+    next_states = np.array(current_states, dtype=np.int64)
+    counters = {'items': 0, 'blocked_seconds': 0, 'evaluation_seconds': 0}
+    while True:
+        start = timer()
+        block = input_q.get(block=True)
+        got = timer()
+        counters['blocked_seconds'] += got - start
+        if block is None:  # stop
+            input_q.task_done()
+            break
+        for column in block.T:  # advance all documents in lockstep
+            next_states = table[(next_states + column) % mod]
+        counters['evaluation_seconds'] += timer() - got
+        counters['items'] += block.size
+        input_q.task_done()
 
-    print_done(start)
+    results_q.put_nowait((next_states, mod, counters))
 
-    print_start('mignotte parameters calculation')
-    start = timer()
-
-    n, k = 5, 5
-    authorized_range, ms = get_mignotte_params(xy_s, n=n, k=k)
-    secret = random.choice(authorized_range)
-    shares = [(secret % mi, mi) for mi in ms[:k]]
-    print(f'shares=' + str([f'{share} (mod {mi})' for share, mi in shares]))
-    assert garner_algorithm([x for x, _ in shares],
-                            [x for _, x in shares]) == secret
 
-    print_done(start)
+def profiled(target, path, *args):
+    """Run target(*args) under cProfile and dump the stats to path."""
+    import cProfile
 
-    print_start('polynomial interpolation')
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        return target(*args)
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+
+
+def profile_paths(profile_dir, polys, chunks=0):
+    """Return the .prof file of every worker (of every chunk task with
+    chunks), in the order the tasks are started."""
+    if not chunks:
+        return [os.path.join(profile_dir, f'{mod}.prof') for mod in polys]
+    return [
+        os.path.join(profile_dir, f'{mod}.{i}.prof') for mod in polys
+        for i in range(chunks)
+    ]
+
+
+def summarize_profiles(profile_dir, paths, lines=25):
+    """Merge the .prof files of a run into merged.prof and summary.txt."""
+    import pstats
+
+    stats = pstats.Stats(*paths)
+    stats.dump_stats(os.path.join(profile_dir, 'merged.prof'))
+    with open(os.path.join(profile_dir, 'summary.txt'), 'w') as f:
+        stats.stream = f
+        stats.sort_stats('tottime').print_stats(lines)
+    print(f'merged {len(paths)} profiles into '
+          f'{os.path.join(profile_dir, "summary.txt")}')
+
+
+def random_block(documents, length):
+    codes = np.array([encode(c) for c in ALPHABET], dtype=np.int64)
+    return codes[randomness.generator('documents').integers(
+        len(ALPHABET), size=(documents, length))]
+
+
+def send(mod, input_q, item):
+    if not METRICS.enabled:
+        input_q.put(item, block=True)
+        return
     start = timer()
-
-    Mod.set_mod(int(np.prod(ms, dtype=np.int64)))
+    input_q.put(item, block=True)
+    METRICS.add('producer_blocked_seconds', timer() - start, mod=mod)
     try:
-        with open('p.bin', 'rb') as f:
-            p = pickle.load(f)
-    except FileNotFoundError:
-        p = PolyMod.interpolate([(x, y) for x, y in xy_s.items()])
-        with open('p.bin', 'wb') as f:
-            pickle.dump(p, f)
-    #print(f'p={str(p)}')
+        METRICS.maximum('queue_depth_max', input_q.qsize(), mod=mod)
+    except NotImplementedError:  # qsize() is unavailable on macOS
+        pass
 
-    print_done(start)
 
-    print_start('CRT sanity')
-    start = timer()
-
-    expected = (secret**2) % (np.prod(ms[:], dtype=np.int64))
-    for i in range(len(shares)):
-        share, mi = shares[i]
-        shares[i] = ((share**2) % mi, mi)
-    print(f'shares=' +
-          str([f'{share % mi} (mod {mi})' for share, mi in shares]))
-    actual = garner_algorithm([x for x, _ in shares], [x for _, x in shares])
-    assert actual == expected, f'expected {expected}, actual={actual}'
-    print_done(start)
+def run_workers(polys, initial_state, documents, profile_dir=None):
+    from tqdm import tqdm
 
     print_start('jobs assignment')
     start = timer()
 
-    initial_state = 200
+    if documents == 1:
+        target, initial = worker, initial_state
+    else:
+        target, initial = batch_worker, [initial_state] * documents
     processes = dict()
-    result_q = multiprocessing.Queue(maxsize=k)
-    for mod in ms[:k]:
+    result_q = multiprocessing.Queue(maxsize=len(polys))
+    paths = profile_paths(profile_dir, polys) if profile_dir else None
+    for i, (mod, poly) in enumerate(polys.items()):
         Mod.set_mod(mod)
         input_q = multiprocessing.JoinableQueue(maxsize=QUEUE_MAX_SIZE)
-        process = multiprocessing.Process(target=worker,
-                                          args=(
-                                              p,
-                                              mod,
-                                              initial_state,
-                                              input_q,
-                                              result_q,
-                                          ))
+        args = (poly, mod, initial, input_q, result_q)
+        if profile_dir:
+            args = (target, paths[i]) + args
+        process = multiprocessing.Process(
+            target=profiled if profile_dir else target, args=args)
         processes[mod] = (process, input_q)
         process.start()
 
@@ -177,13 +252,20 @@ def main():
     start = timer()
 
     total_lines = RANDOM_INPUT_LENGTH
-    for li in tqdm(range(total_lines)):
-        random_char = random.choice(string.ascii_lowercase + '. \n')
-        #inputs = list(map(encode, random_chars))
-        for mod, (_, input_q) in processes.items():
-            Mod.set_mod(mod)
-            #for i in inputs:
-            input_q.put(encode(random_char), block=True)
+    if documents == 1:
+        rng = randomness.generator('documents')
+        for li in tqdm(range(total_lines)):
+            random_char = ALPHABET[rng.integers(len(ALPHABET))]
+            #inputs = list(map(encode, random_chars))
+            for mod, (_, input_q) in processes.items():
+                Mod.set_mod(mod)
+                #for i in inputs:
+                send(mod, input_q, encode(random_char))
+    else:
+        for _ in tqdm(range(0, total_lines, BATCH_BLOCK_LENGTH)):
+            block = random_block(documents, BATCH_BLOCK_LENGTH)
+            for mod, (_, input_q) in processes.items():
+                send(mod, input_q, block)
 
     for _, (_, input_q) in processes.items():
         input_q.put(None, block=True)  # send poison pill
@@ -195,18 +277,87 @@ def main():
     results = list()
     for mod, (proc, input_q) in processes.items():
         input_q.join()
+        state, mod, counters = result_q.get(block=True)
+        for name, value in counters.items():
+            METRICS.add(f'worker_{name}', value, mod=mod)
+        results += [(state, mod)]
+    for proc, _ in processes.values():
         proc.join()
-        results += [result_q.get(block=False)]
-
-    next_state = garner_algorithm([x for x, _ in results],
-                                  [x for _, x in results])
-    print(f'next state is: [{next_state}]!')
 
     print_done(start)
 
-    print_start('state machine drawing')
+    return results
+
+
+def compose_chunk(table, chunk):
+    """Reduce a chunk of encoded characters to the map it induces on Z_mod."""
+    mod = len(table)
+    maps = {c: table[(np.arange(mod) + c) % mod] for c in np.unique(chunk)}
+    composed = np.arange(len(table))
+    for c in chunk:
+        composed = maps[c][composed]
+    return composed
+
+
+def run_scan(polys, initial_state, chunks, profile_dir=None):
+    print_start('parallel scan')
     start = timer()
 
+    encoded = random_block(1, RANDOM_INPUT_LENGTH)[0]
+    tables = {mod: transition_table(poly, mod) for mod, poly in polys.items()}
+
+    tasks = [(tables[mod], chunk) for mod in polys
+             for chunk in np.array_split(encoded, chunks)]
+    with multiprocessing.Pool() as pool:
+        if profile_dir:
+            paths = profile_paths(profile_dir, polys, chunks)
+            maps = pool.starmap(profiled,
+                                [(compose_chunk, path) + task
+                                 for path, task in zip(paths, tasks)])
+        else:
+            maps = pool.starmap(compose_chunk, tasks)
+
+    results = list()
+    for i, mod in enumerate(polys):
+        state = initial_state % mod
+        for composed in maps[i * chunks:(i + 1) * chunks]:  # combine in order
+            state = composed[state]
+        results += [(int(state), mod)]
+        METRICS.add('worker_items', len(encoded), mod=mod)
+
+    print_done(start)
+
+    return results
+
+
+def draw_machine(transitions, initial_state, fmt):
+    """Write diagram.<fmt> unless it was already drawn for this machine.
+    'dot' writes the graph description without running the layout."""
+    path = f'diagram.{fmt}'
+    key = f'{compiler.digest(transitions)}:{initial_state}'
+    try:
+        with open(path + '.sha256') as f:
+            if f.read() == key and os.path.exists(path):
+                print(f'{path} is up to date')
+                return
+    except FileNotFoundError:
+        pass
+
+    if fmt == 'dot':
+        with open(path, 'w') as f:
+            f.write(compiler.to_dot(transitions, initial_state))
+    else:
+        render_machine(transitions, initial_state, path)
+    with open(path + '.sha256', 'w') as f:
+        f.write(key)
+
+
+def render_machine(transitions, initial_state, path):
+    import itertools
+
+    from transitions.extensions import GraphMachine as Machine
+    from transitions.extensions.states import add_state_features, Tags
+
     @add_state_features(Tags)
     class CustomStateMachine(Machine):
         pass
@@ -228,12 +379,180 @@ def main():
                 'dest': str(t[0].get(i)),
                 'after': str(t[1])
             } for i in t[0].keys()] for src, t in transitions.items()])),
-        initial=str(400),
+        initial=str(initial_state),
         show_state_attributes=True)
-    fsm.get_graph().draw('diagram.png', prog='dot')
+    fsm.get_graph().draw(path, prog='dot')
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--documents',
+                        type=int,
+                        default=1,
+                        metavar='N',
+                        help='evaluate N independent documents per worker')
+    parser.add_argument('--chunks',
+                        type=int,
+                        default=0,
+                        metavar='C',
+                        help='split a single input into C chunks and scan '
+                        'them in parallel')
+    parser.add_argument('--machine',
+                        metavar='MACHINE.json',
+                        help='compile this state machine instead of the '
+                        'built-in one')
+    parser.add_argument('--draw',
+                        choices=['png', 'dot'],
+                        help='draw the state machine to diagram.png, or only '
+                        'write diagram.dot (no layout) for large machines')
+    parser.add_argument('--save-polynomial',
+                        action='store_true',
+                        help=f'combine the per-modulus interpolants into the '
+                        f'polynomial over their product and cache it in '
+                        f'{POLY_FILE}')
+    parser.add_argument('--metrics',
+                        metavar='PATH',
+                        help='write stage and worker metrics to a .json or '
+                        '.csv file')
+    parser.add_argument('--metrics-port',
+                        type=int,
+                        metavar='PORT',
+                        help='serve metrics in the Prometheus text format on '
+                        'localhost while running')
+    parser.add_argument('--seed',
+                        type=int,
+                        help='make every random draw reproducible')
+    parser.add_argument('--secure-random',
+                        action='store_true',
+                        help='draw from the OS entropy pool even with --seed')
+    parser.add_argument('--profile',
+                        metavar='DIR',
+                        help='run every worker under cProfile, dump one '
+                        '.prof file per modulus to DIR and merge them into '
+                        'DIR/merged.prof and DIR/summary.txt')
+    args = parser.parse_args()
+    randomness.configure(args.seed, args.secure_random)
+    if args.chunks and args.documents != 1:
+        parser.error('--chunks scans a single document')
+    METRICS.enabled = bool(args.metrics or args.metrics_port)
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+
+    print_start('state machine data generation')
+    start = timer()
+    if args.machine:
+        machine, initial = compiler.load(args.machine, ALPHABET)
+        transitions, initial_state = compiler.compile_machine(
+            machine, initial, encode)
+    else:
+        transitions, initial_state = generate_data(), 200
+
+    xy_s = compiler.points(transitions)
 
     print_done(start)
 
+    print_start('mignotte parameters calculation')
+    start = timer()
+
+    n, k = 5, 5
+    authorized_range, ms = get_mignotte_params(xy_s,
+                                               n=n,
+                                               k=k,
+                                               cache_path=PARAMS_FILE)
+    secret = randomness.python_random('secret').choice(authorized_range)
+    shares = [(secret % mi, mi) for mi in ms[:k]]
+    print(f'shares=' + str([f'{share} (mod {mi})' for share, mi in shares]))
+    assert garner_algorithm([x for x, _ in shares],
+                            [x for _, x in shares]) == secret
+
+    print_done(start)
+
+    print_start('polynomial interpolation')
+    start = timer()
+
+    modulus = math.prod(ms[:k])
+    key = polyfile.digest(xy_s)
+    Mod.set_mod(modulus)
+    if polyfile.is_current(POLY_FILE, modulus, key):
+        # cached polynomial over the product of the moduli, reduced from the
+        # mapped file
+        interpolants = {
+            mod: polyfile.reduced(POLY_FILE, mod)
+            for mod in ms[:k]
+        }
+    else:
+        interpolants = interpolate_per_modulus(xy_s, ms[:k])
+        if args.save_polynomial:
+            p = combine_polynomials(interpolants, modulus)
+            polyfile.save(POLY_FILE, p, modulus, key)
+    #print(f'p={str(p)}')
+
+    print_done(start)
+
+    print_start('polynomial distribution')
+    start = timer()
+
+    polys = {mod: poly.reduce(mod)
+             for mod, poly in interpolants.items()}  # degree < mod, small ints
+    print(f'degrees=' +
+          str([f'{poly.degree} (mod {mi})' for mi, poly in polys.items()]))
+
+    print_done(start)
+
+    print_start('CRT sanity')
+    start = timer()
+
+    expected = (secret**2) % math.prod(ms)
+    for i in range(len(shares)):
+        share, mi = shares[i]
+        shares[i] = ((share**2) % mi, mi)
+    print(f'shares=' +
+          str([f'{share % mi} (mod {mi})' for share, mi in shares]))
+    actual = garner_algorithm([x for x, _ in shares], [x for _, x in shares])
+    assert actual == expected, f'expected {expected}, actual={actual}'
+    print_done(start)
+
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+    if args.chunks:
+        results = run_scan(polys, initial_state, args.chunks, args.profile)
+    else:
+        results = run_workers(polys, initial_state, args.documents,
+                              args.profile)
+    if args.profile:
+        summarize_profiles(args.profile,
+                           profile_paths(args.profile, polys, args.chunks))
+
+    print_start('CRT reconstruction')
+    start = timer()
+
+    if args.documents == 1:
+        next_state = garner_algorithm([int(x) for x, _ in results],
+                                      [x for _, x in results])
+        print(f'next state is: [{next_state}]!')
+    else:
+        next_states = [
+            garner_algorithm([int(x[i]) for x, _ in results],
+                             [x for _, x in results])
+            for i in range(args.documents)
+        ]
+        print(f'next states are: {next_states}')
+
+    print_done(start)
+
+    if args.draw:
+        print_start('state machine drawing')
+        start = timer()
+
+        draw_machine(transitions, initial_state, args.draw)
+
+        print_done(start)
+
+    if args.metrics:
+        METRICS.export(args.metrics)
+
 
 if __name__ == '__main__':
     main()
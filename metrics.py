@@ -0,0 +1,96 @@
+"""
+Pipeline metrics - named stage spans and labelled counters, exported as JSON,
+CSV or Prometheus text (optionally served over HTTP while running).
+"""
+import csv
+import json
+import threading
+
+PREFIX = 'blind_'
+
+
+class Metrics:
+    def __init__(self, enabled=True):
+        self.enabled = enabled  # when False, nothing is recorded
+        self.values = dict()  # (name, ((label, value), ...)) -> value
+        self.types = dict()  # name -> Prometheus type
+        self._lock = threading.Lock()
+
+    def add(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + value
+            self.types[name] = 'counter'
+
+    def maximum(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.values[key] = max(self.values.get(key, value), value)
+            self.types[name] = 'gauge'
+
+    def span(self, stage, seconds):
+        self.add('stage_seconds', seconds, stage=stage)
+
+    def rows(self):
+        with self._lock:
+            return [(name, dict(labels), value)
+                    for (name, labels), value in sorted(self.values.items())]
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump([{
+                'name': name,
+                'labels': labels,
+                'value': value
+            } for name, labels, value in self.rows()],
+                      f,
+                      indent=2)
+
+    def to_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'labels', 'value'])
+            for name, labels, value in self.rows():
+                writer.writerow([
+                    name, ';'.join(f'{k}={v}' for k, v in labels.items()),
+                    value
+                ])
+
+    def export(self, path):
+        (self.to_csv if path.endswith('.csv') else self.to_json)(path)
+
+    def to_prometheus(self):
+        lines, typed = list(), set()
+        for name, labels, value in self.rows():
+            if name not in typed:  # rows are sorted, so once before a name
+                typed.add(name)
+                lines += [f'# TYPE {PREFIX}{name} {self.types[name]}']
+            tags = ','.join(f'{k}="{v}"' for k, v in labels.items())
+            lines += [f'{PREFIX}{name}{{{tags}}} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port):
+        """Serve the Prometheus text format on localhost from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -1,6 +1,8 @@
 import sys
 
-import matplotlib.pyplot as plt
+import numpy as np
+
+from secret_sharing import mathlib
 
 
 def main():
@@ -22,8 +24,10 @@ def main():
 
 
 def plot(f, points):
+    import matplotlib.pyplot as plt
+
     x = list(range(0, 100))
-    y = list(map(f, x))
+    y = f.evaluate(x)
     plt.plot(x, list(y), linewidth=2.0)
     x_list = []
     y_list = []
@@ -37,28 +41,128 @@ def plot(f, points):
     plt.show()
 
 
-def lagrange(points):
-    def P(x):
+class Barycentric:
+    """Lagrange interpolation in barycentric form. The weights are computed
+    once, so each evaluation is O(n).
+
+    With a modulus all arithmetic is exact modulo it (the x differences must
+    be invertible), otherwise it is done in floating point."""
+    def __init__(self, points, modulus=None):
+        self.xs = [x for x, _ in points]
+        self.ys = [y for _, y in points]
+        self.modulus = modulus
+        if len(set(self.xs)) != len(self.xs):
+            raise ValueError('points must be distinct')
+
+        if modulus is not None:
+            dens = list()
+            for j, xj in enumerate(self.xs):
+                den = 1
+                for k, xk in enumerate(self.xs):
+                    if k != j:
+                        den = den * (xj - xk) % modulus
+                dens += [den]
+            self.weights = mathlib.batch_inverse(dens, modulus)
+        else:
+            # the products of the differences overflow from about 170
+            # equispaced nodes on, so they are summed as logarithms
+            self._xs = np.array(self.xs, dtype=float)
+            diffs = self._xs[:, np.newaxis] - self._xs
+            np.fill_diagonal(diffs, 1)
+            signs = np.prod(np.sign(diffs), axis=1)
+            logs = np.log(np.abs(diffs)).sum(axis=1)
+            self.weights = list(signs * np.exp(-logs))
+            # evaluate() only needs the weights up to a common factor, so it
+            # uses them scaled to a largest weight of 1
+            self._w = signs * np.exp(logs.min() - logs)
+            self._wy = self._w * np.array(self.ys, dtype=float)
+
+    def _mod(self, a):
+        return a if self.modulus is None else a % self.modulus
+
+    def _inverse(self, a):
+        return 1 / a if self.modulus is None else mathlib.inverse(
+            a, self.modulus)
+
+    def __call__(self, x):
+        if self.modulus is None:
+            return float(self.evaluate([x])[0])
+
+        # first form: l(x) * sum(w_j * y_j / (x - x_j)), inverting all the
+        # differences with a single modular inverse (Montgomery's trick)
+        diffs = [self._mod(x - xj) for xj in self.xs]
+        if 0 in diffs:
+            return self._mod(self.ys[diffs.index(0)])
+        prefix = [1]
+        for d in diffs:
+            prefix += [self._mod(prefix[-1] * d)]
+        inv = self._inverse(prefix[-1])
         total = 0
-        n = len(points)
-        for i in range(n):
-            xi, yi = points[i]
-
-            def g(i, n):
-
-                tot_mul = 1
-                for j in range(n):
-                    if i == j:
-                        continue
-                    xj, yj = points[j]
-                    tot_mul *= (x - xj) / float(xi - xj)
-
-                return tot_mul
-
-            total += yi * g(i, n)
-        return total
-
-    return P
+        for j in reversed(range(len(diffs))):
+            total += self.weights[j] * self.ys[j] * inv * prefix[j]
+            inv = self._mod(inv * diffs[j])
+        return self._mod(prefix[-1] * total)
+
+    def evaluate(self, xs):
+        """Evaluate at every entry of an array."""
+        if self.modulus is not None:
+            return self._evaluate_modular(xs)
+
+        xs = np.asarray(xs, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            diffs = xs[:, np.newaxis] - self._xs
+            ratios = 1 / diffs
+            result = (ratios @ self._wy) / (ratios @ self._w)
+        exact = diffs == 0  # evaluating at a node
+        rows, cols = np.nonzero(exact)
+        result[rows] = np.array(self.ys, dtype=float)[cols]
+        return result
+
+    def _evaluate_modular(self, xs):
+        """The first form of __call__, one row of differences per point, with
+        the row products inverted together."""
+        m = self.modulus
+        dtype = np.int64 if m < 2**31 else object
+        nodes = np.array([x % m for x in self.xs], dtype=dtype)
+        points = np.array([int(x) % m for x in xs], dtype=dtype)
+        diffs = (points[:, np.newaxis] - nodes) % m
+        prefix = np.ones((len(diffs), len(nodes) + 1), dtype=dtype)
+        for j in range(len(nodes)):
+            prefix[:, j + 1] = prefix[:, j] * diffs[:, j] % m
+
+        rows, cols = np.nonzero(diffs == 0)  # evaluating at a node
+        totals = prefix[:, -1].copy()
+        totals[rows] = 1
+        inv = np.array(mathlib.batch_inverse([int(t) for t in totals], m),
+                       dtype=dtype)
+        wy = [w * y % m for w, y in zip(self.weights, self.ys)]
+        total = np.zeros_like(inv)
+        for j in reversed(range(len(nodes))):
+            total = (total + wy[j] * inv % m * prefix[:, j]) % m
+            inv = inv * diffs[:, j] % m
+        result = prefix[:, -1] * total % m
+        result[rows] = [self.ys[j] % m for j in cols]
+        return result
+
+    def coefficients(self):
+        """Return the coefficients of the interpolating polynomial, lowest
+        degree first: sum(w_j * y_j * l(x) / (x - x_j)), l(x) = prod(x - x_j)."""
+        full = [1]  # l(x)
+        for xj in self.xs:
+            full = [self._mod(a - xj * b)
+                    for a, b in zip([0] + full, full + [0])]
+        result = [0] * len(self.xs)
+        for j, xj in enumerate(self.xs):
+            c = self._mod(self.weights[j] * self.ys[j])
+            carry = 0  # synthetic division of l(x) by (x - x_j)
+            for i in reversed(range(len(self.xs))):
+                carry = self._mod(full[i + 1] + xj * carry)
+                result[i] = self._mod(result[i] + c * carry)
+        return result
+
+
+def lagrange(points, modulus=None):
+    return Barycentric(points, modulus)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+"""
+Versioned binary format for interpolated polynomials.
+
+Layout (little endian):
+    header      - magic, format version, limbs per integer, number of
+                  coefficients and the sha256 key of the interpolated data
+    modulus     - `limbs` uint64 words
+    coeffs      - (n, limbs) uint64 words, lowest limb first
+
+load() rebuilds the polynomial as Python ints; reduced() works on the mapped
+words directly, for callers that only need it modulo a smaller prime.
+"""
+import hashlib
+import os
+import struct
+
+import numpy as np
+
+from polynomials.polymod import Mod, PolyMod
+
+MAGIC = b'PMOD'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHHQ32s')
+
+
+def digest(points):
+    """Return the sha256 key of the interpolation points (x -> y dict)."""
+    h = hashlib.sha256()
+    for x, y in sorted(points.items()):
+        h.update(f'{x}:{y};'.encode())
+    return h.digest()
+
+
+def _to_words(values, limbs):
+    raw = b''.join(int(v).to_bytes(8 * limbs, 'little') for v in values)
+    return np.frombuffer(raw, dtype='<u8').reshape(len(values), limbs)
+
+
+def _to_ints(words):
+    if words.shape[1] == 1:
+        return words[:, 0].tolist()
+    return [int.from_bytes(row.tobytes(), 'little') for row in words]
+
+
+def save(path, poly, modulus, key):
+    limbs = max(1, (modulus.bit_length() + 63) // 64)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, limbs, len(poly), key))
+        f.write(_to_words([modulus], limbs).tobytes())
+        f.write(_to_words([t.value for t in poly.terms], limbs).tobytes())
+    os.replace(path + '.tmp', path)  # atomic
+
+
+def read_header(path):
+    """Return (limbs, number of coefficients, modulus, key), or None if the
+    file is missing, truncated or was written by another format version."""
+    try:
+        with open(path, 'rb') as f:
+            magic, version, limbs, n, key = _HEADER.unpack(
+                f.read(_HEADER.size))
+            modulus = _to_ints(
+                np.frombuffer(f.read(8 * limbs), dtype='<u8').reshape(1, -1))
+            size = os.fstat(f.fileno()).st_size
+    except (FileNotFoundError, struct.error, ValueError):
+        return None
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    if size != _HEADER.size + 8 * limbs * (n + 1):  # modulus and coeffs
+        return None
+    return limbs, n, modulus[0], key
+
+
+def is_current(path, modulus=None, key=None):
+    """Return whether the file holds a polynomial for this modulus and key
+    in the current format version."""
+    header = read_header(path)
+    if header is None:
+        return False
+    _, _, saved_modulus, saved_key = header
+    return (modulus is None or saved_modulus == modulus) and \
+        (key is None or saved_key == key)
+
+
+def coefficients(path):
+    """Map the coefficient words of a saved polynomial without copying."""
+    limbs, n, _, _ = read_header(path)
+    return np.memmap(path,
+                     dtype='<u8',
+                     mode='r',
+                     offset=_HEADER.size + 8 * limbs,
+                     shape=(n, limbs))
+
+
+def load(path, modulus=None, key=None):
+    """Load a saved polynomial, reducing its coefficients by the current
+    Mod.M - one Python int per coefficient. Returns None when the file is
+    missing or stale (truncated, another format version, modulus or key)."""
+    if not is_current(path, modulus, key):
+        return None
+    return PolyMod(_to_ints(coefficients(path)))
+
+
+def reduced(path, prime):
+    """Return the saved polynomial over Z_prime, as PolyMod.reduce would,
+    reducing the mapped words with NumPy - the coefficients over the full
+    modulus never become Python ints. Leaves Mod.M set to prime."""
+    words = coefficients(path)
+    dtype = np.int64 if prime < 2**31 else object
+    acc = np.zeros(len(words), dtype=dtype)
+    for i in reversed(range(words.shape[1])):  # Horner over the limbs
+        limb = words[:, i] % np.uint64(prime) if dtype is np.int64 \
+            else words[:, i].astype(object) % prime
+        acc = (acc * (2**64 % prime) + limb.astype(dtype)) % prime
+
+    exponents = np.arange(len(acc))  # x^prime = x over Z_prime (Fermat)
+    exponents[prime:] = (exponents[prime:] - 1) % (prime - 1) + 1
+    ply = np.zeros(min(len(acc), prime), dtype=dtype)
+    np.add.at(ply, exponents, acc)
+    Mod.set_mod(prime)
+    poly = PolyMod((ply % prime).tolist())
+    return PolyMod(poly.terms[:poly.degree + 1])
@@ -1,4 +1,10 @@
+import numpy as np
+
+from secret_sharing import mathlib
+
+
 class Mod:
+    __slots__ = ('value', )
     M = 17
 
     @staticmethod
@@ -10,26 +16,15 @@ class Mod:
 
     @staticmethod
     def math_mod(a):
-        return (abs(a * Mod.M) + a) % Mod.M
+        return a % Mod.M  # python's % is already non-negative for M > 0
 
     @staticmethod
     def exp_mod(a, b):
-        if b == 0:
-            return 1
-        else:
-            z = Mod.exp_mod(a, b // 2)
-            if b % 2 == 0:
-                return Mod.math_mod(z * z)
-            else:
-                return Mod.math_mod(a * z * z)
+        return pow(a, b, Mod.M)
 
     @staticmethod
     def egcd(a, b):
-        if b == 0:
-            return (a, 1, 0)
-        else:
-            (d, x, y) = Mod.egcd(b, a % b)
-            return (d, y, x - (a // b) * y)
+        return mathlib.exgcd(a, b)
 
     def __init__(self, n):
         self.value = Mod.math_mod(n)
@@ -91,13 +86,68 @@ class Mod:
     def inverse(self):
         if self.value == 0:
             raise Exception("Inverse of 0 is undefined.")
-        val = Mod.egcd(Mod.M, self.value)
-        if val[0] == 1:
-            return Mod(val[2])
-        else:
+        try:
+            return Mod(mathlib.inverse(self.value, Mod.M))
+        except ValueError:
             raise Exception("Mod and value are not co-prime. Inverse is undefined.")
 
 
+class ModSum:
+    """In-place accumulator for sums of products modulo Mod.M - terms are
+    added as plain integers and reduced once, when the value is read."""
+    __slots__ = ('total', )
+
+    def __init__(self, total=0):
+        self.total = total
+
+    def add(self, a, b=1):
+        self.total += a * b
+        return self
+
+    @property
+    def value(self):
+        return self.total % Mod.M
+
+
+KARATSUBA_CUTOFF = 32  # below this length schoolbook multiplication wins
+SPARSE_DENSITY = 0.25  # compact() goes sparse below this nonzero ratio
+
+
+def _schoolbook(a, b):
+    sums = [ModSum() for _ in range(len(a) + len(b) - 1)]
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            sums[i + j].add(x, y)
+    return [s.total for s in sums]
+
+
+def _shifted_add(target, values, shift, sign=1):
+    for i, v in enumerate(values):
+        target[i + shift] += sign * v
+
+
+def _multiply(a, b):
+    """Multiply coefficient lists (lowest degree first) without reducing."""
+    if min(len(a), len(b)) < KARATSUBA_CUTOFF:
+        return _schoolbook(a, b)
+    n = max(len(a), len(b)) // 2
+    a0, a1, b0, b1 = a[:n], a[n:], b[:n], b[n:]
+    z0 = _multiply(a0, b0)
+    z2 = _multiply(a1, b1) if a1 and b1 else []
+    sa = [x + (a1[i] if i < len(a1) else 0) for i, x in enumerate(a0)] + \
+        a1[len(a0):]
+    sb = [x + (b1[i] if i < len(b1) else 0) for i, x in enumerate(b0)] + \
+        b1[len(b0):]
+    z1 = _multiply(sa, sb)  # (a0 + a1)(b0 + b1) = z0 + z1' + z2
+    result = [0] * (len(a) + len(b) - 1)
+    _shifted_add(result, z0, 0)
+    _shifted_add(result, z1, n)
+    _shifted_add(result, z0, n, -1)
+    _shifted_add(result, z2, n, -1)
+    _shifted_add(result, z2, 2 * n)
+    return result
+
+
 class PolyMod:
     @staticmethod
     def interpolate(points):
@@ -132,13 +182,21 @@ class PolyMod:
         return
 
     def __call__(self, v):
-        sum = Mod(0)
-        n = Mod(v)
-        i = 0
-        while i < len(self.terms):
-            sum += self.terms[i] * (n ** i)
-            i += 1
-        return sum
+        x = Mod.math_mod(v.value if isinstance(v, Mod) else v)
+        acc = 0
+        for term in reversed(self.terms):  # Horner's rule on plain integers
+            acc = (acc * x + term.value) % Mod.M
+        return Mod(acc)
+
+    def evaluate_many(self, values):
+        """Evaluate the polynomial at every entry of an integer array
+        (Horner's rule, modulo Mod.M)."""
+        dtype = np.int64 if Mod.M < 2**31 else object
+        values = np.asarray(values, dtype=dtype) % Mod.M
+        acc = np.zeros_like(values)
+        for term in reversed(self.terms):
+            acc = (acc * values + term.value % Mod.M) % Mod.M
+        return acc
 
     def __len__(self):
         return len(self.terms)
@@ -166,6 +224,8 @@ class PolyMod:
         return out
 
     def __add__(self, p):
+        if isinstance(p, SparsePolyMod):
+            return p + self
         ply = []
         c = 0
         for i in range(max(len(self.terms), len(p))):
@@ -179,6 +239,8 @@ class PolyMod:
         return PolyMod(ply)
 
     def __sub__(self, p):
+        if isinstance(p, SparsePolyMod):
+            return SparsePolyMod.from_dense(self) - p
         ply = []
         c = 0
         for i in range(max(len(self.terms), len(p))):
@@ -192,17 +254,14 @@ class PolyMod:
         return PolyMod(ply)
 
     def __mul__(self, p):
-        ply = []
+        if isinstance(p, SparsePolyMod):
+            return SparsePolyMod.from_dense(self) * p
         if isinstance(p, PolyMod):
-            for i in range(len(self.terms)):
-                for j in range(len(p)):
-                    try:
-                        ply[i + j] += self.terms[i] * p[j]
-                    except:
-                        ply.insert(i + j, self.terms[i] * p[j])
+            ply = _multiply([t.value for t in self.terms],
+                            [t.value for t in p.terms])
         else:
-            for i in range(len(self.terms)):
-                ply.insert(i, self.terms[i] * p)
+            m = p.value if isinstance(p, Mod) else p
+            ply = [t.value * m for t in self.terms]
         return PolyMod(ply)
 
     def __iadd__(self, p):
@@ -228,6 +287,8 @@ class PolyMod:
         return 0
 
     def __eq__(self, p):
+        if isinstance(p, SparsePolyMod):
+            return p == self
         j = 0
         for i in p.terms:
             if self.terms[j] != i:
@@ -243,3 +304,105 @@ class PolyMod:
             if i != 0:
                 return False
         return True
+
+    def reduce(self, prime):
+        """Return the equivalent polynomial over Z_prime - coefficients
+        modulo prime and, as x^prime = x there (Fermat), degree below prime.
+        Leaves Mod.M set to prime."""
+        Mod.set_mod(prime)
+        ply = [0] * min(len(self.terms), prime)
+        for e, t in enumerate(self.terms):
+            ply[e if e < prime else (e - 1) % (prime - 1) + 1] += t.value
+        reduced = PolyMod(ply)
+        return PolyMod(reduced.terms[:reduced.degree + 1])
+
+    @staticmethod
+    def compact(p):
+        """Return p as a SparsePolyMod when few of its terms are nonzero."""
+        nonzero = sum(t.value != 0 for t in p.terms)
+        if nonzero < SPARSE_DENSITY * len(p.terms):
+            return SparsePolyMod.from_dense(p)
+        return p
+
+
+class SparsePolyMod:
+    """Polynomial modulo Mod.M kept as {exponent: nonzero coefficient}."""
+    def __init__(self, terms=None):
+        self.terms = {
+            e: c % Mod.M
+            for e, c in (terms or dict()).items() if c % Mod.M != 0
+        }
+        self.degree = max(self.terms, default=0)
+
+    @staticmethod
+    def from_dense(p):
+        return SparsePolyMod({e: t.value for e, t in enumerate(p.terms)})
+
+    def to_dense(self):
+        ply = [0] * (self.degree + 1)
+        for e, c in self.terms.items():
+            ply[e] = c
+        return PolyMod(ply)
+
+    def __len__(self):
+        return self.degree + 1
+
+    def __call__(self, v):
+        x = Mod.math_mod(v.value if isinstance(v, Mod) else v)
+        acc, power, last = ModSum(), 1, 0
+        for e in sorted(self.terms):  # step between the used powers only
+            power = power * pow(x, e - last, Mod.M) % Mod.M
+            last = e
+            acc.add(self.terms[e], power)
+        return Mod(acc.value)
+
+    def evaluate_many(self, values):
+        dtype = np.int64 if Mod.M < 2**31 else object
+        values = np.asarray(values, dtype=dtype) % Mod.M
+        acc, power, last = np.zeros_like(values), np.ones_like(values), 0
+        for e in sorted(self.terms):
+            step, base = e - last, values
+            while step:  # square-and-multiply by values^(e - last)
+                if step & 1:
+                    power = power * base % Mod.M
+                base, step = base * base % Mod.M, step >> 1
+            last = e
+            acc = (acc + self.terms[e] % Mod.M * power) % Mod.M
+        return acc
+
+    def _combine(self, p, sign):
+        if isinstance(p, PolyMod):
+            p = SparsePolyMod.from_dense(p)
+        terms = dict(self.terms)
+        for e, c in p.terms.items():
+            terms[e] = terms.get(e, 0) + sign * c
+        return SparsePolyMod(terms)
+
+    def __add__(self, p):
+        return self._combine(p, 1)
+
+    def __sub__(self, p):
+        return self._combine(p, -1)
+
+    def __mul__(self, p):
+        if isinstance(p, PolyMod):
+            p = SparsePolyMod.from_dense(p)
+        if not isinstance(p, SparsePolyMod):
+            m = p.value if isinstance(p, Mod) else p
+            return SparsePolyMod({e: c * m for e, c in self.terms.items()})
+        terms = dict()
+        for e1, c1 in self.terms.items():
+            for e2, c2 in p.terms.items():
+                terms[e1 + e2] = terms.get(e1 + e2, 0) + c1 * c2
+        return SparsePolyMod(terms)
+
+    def __eq__(self, p):
+        if isinstance(p, PolyMod):
+            p = SparsePolyMod.from_dense(p)
+        return self.terms == p.terms
+
+    def __ne__(self, p):
+        return not (self == p)
+
+    def __str__(self):
+        return str(self.to_dense())
@@ -10,20 +10,21 @@ See the bottom few lines for usage. Tested on Python 2 and 3.
 from __future__ import division
 from __future__ import print_function
 
-import functools
-import random
+import randomness
+from secret_sharing import mathlib
 
 # 12th Mersenne Prime
 # (for this application we want a known prime number as close as
 # possible to our security level; e.g.  desired security level of 128
 # bits -- too large and all the ciphertext is large; too small and
 # security is compromised)
-import numpy as np
-
 _PRIME = 2 ** 127 - 1
 # 13th Mersenne Prime is 2**521 - 1
 
-_RINT = functools.partial(random.SystemRandom().randint, 0)
+
+def _rint(prime):
+    # SystemRandom unless a seed is configured, see randomness
+    return randomness.python_random('shamir').randint(0, prime)
 
 
 def _eval_at(poly, x, prime):
@@ -45,7 +46,7 @@ def make_random_shares(minimum, shares, prime=_PRIME):
     '''
     if minimum > shares:
         raise ValueError("pool secret would be irrecoverable")
-    poly = [_RINT(prime) for i in range(minimum)]
+    poly = [_rint(prime) for i in range(minimum)]
     points = [(i, _eval_at(poly, i, prime))
               for i in range(1, shares + 1)]
     return poly[0], points
@@ -59,16 +60,8 @@ def _extended_gcd(a, b):
     be computed via extended Euclidean algorithm
     http://en.wikipedia.org/wiki/Modular_multiplicative_inverse#Computation
     '''
-    x = 0
-    last_x = 1
-    y = 1
-    last_y = 0
-    while b != 0:
-        quot = a // b
-        a, b = b, a % b
-        x, last_x = last_x - quot * x, x
-        y, last_y = last_y - quot * y, y
-    return last_x, last_y
+    x, y, _ = mathlib.extended_gcd(a, b)
+    return x, y
 
 
 def _divmod(num, den, p):
@@ -77,8 +70,7 @@ def _divmod(num, den, p):
     To explain what this means, the return value will be such that
     the following is true: den * _divmod(num, den, p) % p == num
     '''
-    inv, _ = _extended_gcd(den, p)
-    return num * inv
+    return num * mathlib.inverse(den % p, p)
 
 
 def _lagrange_interpolate(x, x_s, y_s, p):
@@ -94,7 +86,7 @@ def _lagrange_interpolate(x, x_s, y_s, p):
     def PI(vals, p):  # upper-case PI -- product of inputs
         accum = 1
         for v in vals:
-            accum = np.mod(np.multiply(accum, v), p)
+            accum = accum * v % p  # exact, unlike an int64 np.multiply
         return accum
 
     nums = []  # avoid inexact division
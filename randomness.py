@@ -0,0 +1,89 @@
+"""
+Central random number configuration.
+
+Every randomised component asks for its own stream by name (and by worker
+index, where work is split across processes), so seeding one component
+never shifts the draws of another:
+
+    rng = randomness.generator('documents')              # numpy Generator
+    rng = randomness.generator('corpus', worker=i)       # one per worker
+    rnd = randomness.python_random('secret')             # random.Random API
+
+Without a seed every stream draws fresh OS entropy, and python_random() is
+a SystemRandom, as the modules used before. With a seed the streams are
+reproducible. secure=True opts back into OS entropy even when a seed is
+given. The configuration is kept in the environment, so spawned worker
+processes inherit it.
+
+generator() is PCG64 even when seeded from OS entropy, which is not a
+cryptographic generator. Code that draws key material checks secure() and
+takes it from python_random() (a SystemRandom then) instead.
+"""
+import os
+import random
+import zlib
+
+import numpy as np
+
+SEED_VARIABLE = 'BLIND_SEED'
+SECURE_VARIABLE = 'BLIND_SECURE_RANDOM'
+
+_generators = dict()  # (component, worker) -> Generator
+_randoms = dict()  # (component, worker) -> random.Random
+
+
+def configure(seed=None, secure=False):
+    os.environ.pop(SEED_VARIABLE, None)
+    if seed is not None:
+        os.environ[SEED_VARIABLE] = str(seed)
+    os.environ[SECURE_VARIABLE] = '1' if secure else ''
+    _generators.clear()
+    _randoms.clear()
+
+
+def secure():
+    """Return whether key material must come from the OS entropy pool."""
+    return bool(os.environ.get(SECURE_VARIABLE))
+
+
+def seed():
+    """Return the configured seed, or None when draws are not reproducible."""
+    if secure():
+        return None
+    value = os.environ.get(SEED_VARIABLE)
+    return None if value is None else int(value)
+
+
+def seed_sequence(component, worker=None):
+    """Return a new SeedSequence for the component, spawned from the seed
+    by the component's name and the worker index."""
+    if seed() is None:
+        return np.random.SeedSequence()
+    key = (zlib.crc32(component.encode()), )
+    if worker is not None:
+        key += (worker, )
+    return np.random.SeedSequence(seed(), spawn_key=key)
+
+
+def generator(component, worker=None):
+    """Return the component's Generator, continuing the same stream on every
+    call in this process."""
+    key = (component, worker)
+    if key not in _generators:
+        _generators[key] = np.random.default_rng(
+            seed_sequence(component, worker))
+    return _generators[key]
+
+
+def python_random(component, worker=None):
+    """Return the component's random.Random, for code that needs Python
+    integers of any size - a SystemRandom unless a seed is configured."""
+    key = (component, worker)
+    if key not in _randoms:
+        if seed() is None:
+            _randoms[key] = random.SystemRandom()
+        else:
+            state = seed_sequence(component, worker).generate_state(4)
+            _randoms[key] = random.Random(
+                int.from_bytes(state.tobytes(), 'little'))
+    return _randoms[key]
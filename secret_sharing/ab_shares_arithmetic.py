@@ -1,13 +1,13 @@
 import hashlib
 import numpy as np
-import random
 import string
 from matplotlib import pyplot as plt
 from progressbar import progressbar
 
-from crr.generic_functions import get_ab_share
-from crr.polymod import Mod, PolyMod
-from crr.mathlib import garner_algorithm
+import randomness
+from crt.generic_functions import get_ab_share
+from polynomials.polymod import Mod, PolyMod
+from secret_sharing.mathlib import garner_algorithm
 
 NUMBER_OF_ITERATIONS = 10**6
 
@@ -22,9 +22,10 @@ def main():
     expected = hashlib.sha256()
     actual = hashlib.sha256()
 
+    rnd = randomness.python_random('ab_shares_arithmetic')
     for _ in progressbar(range(NUMBER_OF_ITERATIONS)):
         # generate random secret
-        s = random.choice(string.ascii_lowercase)
+        s = rnd.choice(string.ascii_lowercase)
         # find Asmuth-Bloom secret shares
         share = get_ab_share(ord(s), m0, ms)
         shares = list()
@@ -1,11 +1,9 @@
 #!/usr/bin/env python
 import binascii
-import random
 import sys
 
-from numpy import long
-
-from crr import mathlib
+import randomness
+from secret_sharing import mathlib
 
 
 class AsmuthBloom(object):
@@ -103,7 +101,7 @@ class AsmuthBloom(object):
 
 
 def stringToLong(s):
-    return long(binascii.hexlify(s), 16)
+    return int(binascii.hexlify(s.encode()), 16)
 
 
 if len(sys.argv) < 4:
@@ -116,8 +114,8 @@ if len(sys.argv) < 4:
 
 source = sys.argv[1]
 if source == '--random':
-    random = random.SystemRandom()
-    secret = random.getrandbits(int(sys.argv.pop(2)))
+    secret = randomness.python_random('bloom').getrandbits(
+        int(sys.argv.pop(2)))
 else:
     try:
         secret = stringToLong(open(source).read())
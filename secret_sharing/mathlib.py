@@ -2,9 +2,13 @@
 """
 Mathlib by Tomasz Nowacki
 """
-import random
+import functools
 
-_random = random.SystemRandom()
+import randomness
+
+
+def _random():
+    return randomness.python_random('mathlib')  # SystemRandom unless seeded
 
 _small_odd_primes = [
     3, 5, 7, 11, 13, 17, 19, 23, 29,
@@ -66,8 +70,8 @@ def get_random_range(a, b):
     a_bits = bit_len(a)
     b_bits = bit_len(b)
     while True:
-        k = _random.randrange(a_bits, b_bits)
-        n = _random.getrandbits(k)
+        k = _random().randrange(a_bits, b_bits)
+        n = _random().getrandbits(k)
         if a < n < b:
             return n
 
@@ -96,7 +100,7 @@ def miller_rabin_test(n, rounds):
         r = r >> 1  # r = r / 2
         s = s + 1
     for _ in range(rounds):
-        a = random.randint(2, n - 1)
+        a = _random().randint(2, n - 1)
         y = pow(a, r, n)
         if y != 1 and y != n - 1:
             for _ in range(s - 1):
@@ -156,7 +160,7 @@ def primality_test_for_sg_prime(n):
 def get_prime(k):
     """Generate k-bit random prime number"""
     while True:
-        p = _random.getrandbits(k)
+        p = _random().getrandbits(k)
         p = p | (1 << (k - 1) | 1)  # setting lower and higher bit to 1
         if primality_test(p):
             return p
@@ -166,7 +170,7 @@ def get_sg_prime(k):
     """Generate k-bit random Sophie Germain prime number n such that p=2*n+1 
     is also a prime"""
     while True:
-        n = _random.getrandbits(k)
+        n = _random().getrandbits(k)
         n = n | (1 << (k - 1) | 1)  # setting lower and higher bit to 1
         if primality_test_for_sg_prime(n):
             return n
@@ -210,57 +214,55 @@ def extended_gcd(a, b):
 
 
 def exgcd(a, b):
-    d = a
-    x = 1
-    y = 0
-    if b == 0:
-        return d, x, y
-    x2 = 1
-    x1 = 0
-    y2 = 0
-    y1 = 1
-    while b > 0:
-        q = a // b
-        r = a - q * b
-        x = x2 - q * x1
-        y = y2 - q * y1
-        a = b
-        b = r
-        x2 = x1
-        x1 = x
-        y2 = y1
-        y1 = y
-        print('q = %s, r = %s, x= %s, y= %s, a = %s, b= %s, x2 = %s, x1= %s, y2= %s,y1= %s' % (
-            q, r, x, y, a, b, x2, x1, y2, y1))
-    d = a
-    d = a
-    x = x2
-    y = y2
+    """Return (gcd(a,b), x, y) such that a*x + b*y = gcd(a,b)."""
+    x, y, d = extended_gcd(a, b)
     return d, x, y
 
 
+@functools.lru_cache(maxsize=2**16)
+def inverse(a, m):
+    """Return the inverse of a modulo m, raising ValueError when a and m are
+    not co-prime. Cached, as the same moduli and differences recur across
+    interpolation, Garner and Shamir recovery."""
+    return pow(a, -1, m)
+
+
+def batch_inverse(values, m):
+    """Invert every value modulo m with a single modular inverse
+    (Montgomery's trick)."""
+    prefix = [1]
+    for a in values:
+        prefix += [prefix[-1] * a % m]
+    inv = inverse(prefix[-1], m)
+    result = [0] * len(values)
+    for i in reversed(range(len(values))):
+        result[i] = inv * prefix[i] % m
+        inv = inv * values[i] % m
+    return result
+
+
 def multiplicative_inverse(a, b):
     """Calculate multiplicative inverse of a modulo b."""
-    m, _, _ = extended_gcd(a, b)
-    if m < 0:
-        m = m % b
-    return m
+    return inverse(a % b, b)
+
+
+@functools.lru_cache(maxsize=256)
+def crt_constants(m):
+    """Return Garner's constants for the moduli tuple m: C[i], the inverse
+    of m[0]*...*m[i-1] modulo m[i], and the products m[0]*...*m[i-1]."""
+    C, products = [0] * len(m), [1] * len(m)
+    for i in range(1, len(m)):
+        products[i] = products[i - 1] * m[i - 1]
+        C[i] = inverse(products[i] % m[i], m[i])
+    return C, products
 
 
 def garner_algorithm(v, m):
     """Garner algorithm for calculating CRT."""
-    C = [0] * len(m)
-    for i in range(1, len(m)):
-        C[i] = 1
-        for j in range(0, i):
-            u = multiplicative_inverse(m[j], m[i])
-            C[i] = (u * C[i]) % m[i]
+    C, products = crt_constants(tuple(int(mi) for mi in m))
     u = v[0]
     x = u
     for i in range(1, len(m)):
         u = ((v[i] - x) * C[i]) % m[i]
-        s = 1
-        for j in range(0, i):
-            s = s * m[j]
-        x = x + u * s
+        x = x + u * products[i]
     return x
@@ -0,0 +1,199 @@
+"""
+Compiles a state machine definition into interpolation points.
+
+A machine is kept as {state: (transitions, output)} where transitions maps an
+input symbol to the next state, loaded either from a JSON file:
+
+    {
+        "initial": "start",
+        "states": {
+            "start": {"output": 0, "default": "start", "transitions": {"n": "n"}},
+            ...
+        }
+    }
+
+or from a `transitions` library machine. Compiling assigns every state an
+integer code and returns the machine in the {code: ({encoded symbol: code},
+output)} form used by main.py.
+"""
+import hashlib
+import itertools
+import json
+
+
+def check(machine, initial, alphabet=None):
+    """Raise unless every state has a transition for every symbol (of the
+    alphabet, or else of any state) to a defined state - the polynomial
+    maps a missing key to an arbitrary field element, not a state code."""
+    if initial not in machine:
+        raise Exception(f'initial state [{initial}] is not defined')
+    if alphabet is None:
+        alphabet = set().union(*(t for t, _ in machine.values()))
+    for state, (t, _) in machine.items():
+        missing = sorted(set(alphabet) - set(t))
+        if missing:
+            raise Exception(
+                f'state [{state}] has no transition for {missing} - list them '
+                f'or give it a default')
+        for c, dest in t.items():
+            if dest not in machine:
+                raise Exception(f'state [{state}] goes to undefined state '
+                                f'[{dest}] on [{c}]')
+
+
+def load(path, alphabet):
+    """Load a JSON machine; `default` fills every alphabet symbol not listed.
+    Raises if a state still misses a symbol or names an undefined state."""
+    with open(path) as f:
+        spec = json.load(f)
+
+    machine = dict()
+    for state, desc in spec['states'].items():
+        transitions = dict()
+        if 'default' in desc:
+            transitions.update({c: desc['default'] for c in alphabet})
+        transitions.update(desc.get('transitions', dict()))
+        machine[state] = (transitions, desc.get('output', 0))
+    check(machine, spec['initial'], alphabet)
+    return machine, spec['initial']
+
+
+def from_machine(fsm, alphabet=None):
+    """Convert a `transitions` machine, triggers being the input symbols.
+    Outputs are read from 'out: N' state tags when present. The to_<state>
+    triggers the library adds are skipped, and so are triggers outside the
+    alphabet when one is given. Raises unless every state has a transition
+    for every symbol, see check()."""
+    auto = {f'to_{name}' for name in fsm.states} \
+        if fsm.auto_transitions else set()
+    machine = dict()
+    for name, state in fsm.states.items():
+        output = 0
+        for tag in getattr(state, 'tags', []):
+            if tag.startswith('out: '):
+                output = int(tag[len('out: '):])
+        machine[name] = (dict(), output)
+    for trigger, event in fsm.events.items():
+        if trigger in auto or (alphabet is not None
+                               and trigger not in alphabet):
+            continue
+        for source, transitions in event.transitions.items():
+            for t in transitions:
+                # internal transitions (dest=None) stay in the source
+                machine[source][0][trigger] = t.dest or source
+    check(machine, fsm.initial, alphabet)
+    return machine, fsm.initial
+
+
+def points(transitions):
+    """Return the interpolation points {state + symbol: next state}."""
+    xy_s = dict()
+    for src, (t, _) in transitions.items():
+        for i, dest in t.items():
+            if xy_s.get(src + i, dest) != dest:
+                raise Exception(
+                    f'transition key [{src + i}] leads to both [{xy_s[src + i]}]'
+                    f' and [{dest}] - consider another state encoding')
+            xy_s[src + i] = dest
+    return xy_s
+
+
+def digest(transitions):
+    """Return a sha256 hex digest of an encoded machine, outputs included."""
+    h = hashlib.sha256()
+    for src, (t, output) in sorted(transitions.items()):
+        h.update(f'{src}:{output}:{sorted(t.items())};'.encode())
+    return h.hexdigest()
+
+
+def to_dot(transitions, initial):
+    """Write the machine as graphviz DOT text, one edge per (source,
+    destination) pair, without laying it out."""
+    lines = ['digraph machine {', f'    "{initial}" [shape=doublecircle];']
+    for src, (t, output) in transitions.items():
+        lines += [f'    "{src}" [label="{src}\\nout: {output}"];']
+        edges = dict()
+        for i, dest in sorted(t.items()):
+            edges.setdefault(dest, []).append(str(i))
+        lines += [
+            f'    "{src}" -> "{dest}" [label="in: {",".join(symbols)}"];'
+            for dest, symbols in edges.items()
+        ]
+    return '\n'.join(lines + ['}']) + '\n'
+
+
+def _reachable(machine, initial):
+    order, queue = [initial], [initial]
+    while queue:
+        for dest in machine[queue.pop(0)][0].values():
+            if dest not in order:
+                order.append(dest)
+                queue.append(dest)
+    return order + [s for s in machine if s not in order]
+
+
+def assign_codes(machine, initial, encode):
+    """Greedily assign state codes, preferring codes whose keys coincide with
+    already placed keys of the same destination (fewer points means a lower
+    degree) and then the smallest code (a narrower key range)."""
+    codes = dict()
+    used = dict()  # key -> destination state
+    for state in _reachable(machine, initial):
+        symbols = [(encode(c), dest) for c, dest in machine[state][0].items()]
+        limit = max(itertools.chain(used, [0])) + 1
+        best = None
+        for code in range(limit + 1):
+            if code in codes.values():
+                continue
+            keys = [(code + i, dest) for i, dest in symbols]
+            if any(used.get(key, dest) != dest for key, dest in keys):
+                continue
+            merged = sum(key in used for key, _ in keys)
+            if best is None or merged > best[0]:
+                best = (merged, code)
+        _, codes[state] = best
+        used.update((best[1] + i, dest) for i, dest in symbols)
+    return codes
+
+
+def compile_machine(machine, initial, encode, codes=None):
+    """Return (transitions, initial code) in main.py's encoded form."""
+    check(machine, initial)
+    if codes is None:
+        codes = assign_codes(machine, initial, encode)
+    transitions = {
+        codes[state]: ({encode(c): codes[dest]
+                        for c, dest in t.items()}, output)
+        for state, (t, output) in machine.items()
+    }
+    points(transitions)  # reject colliding keys
+    return transitions, codes[initial]
+
+
+def main():
+    import argparse
+    import os
+    import sys
+
+    # main.py sits in the repository root, which is not on the path when
+    # this file is run as a script
+    sys.path.insert(0, os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    from main import ALPHABET, encode
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('machine_file', metavar='MACHINE.json')
+    args = parser.parse_args()
+
+    machine, initial = load(args.machine_file, ALPHABET)
+    codes = assign_codes(machine, initial, encode)
+    transitions, _ = compile_machine(machine, initial, encode, codes)
+    xy_s = points(transitions)
+    print('state codes: ' + ', '.join(f'{s}={c}' for s, c in codes.items()))
+    print(f'transitions: {sum(len(t) for t, _ in machine.values())}, '
+          f'interpolation points: {len(xy_s)} (degree <= {len(xy_s) - 1}), '
+          f'keys in [{min(xy_s)}, {max(xy_s)}]')
+
+
+if __name__ == '__main__':
+    main()